@@ -0,0 +1,49 @@
+#Package 'acoustics' contains the loading, spectral, banding, weighting, beamforming and
+#sound power functions.  Its submodules are only imported when one of their names is first
+#used, so a worker that needs autospec does not pay for beamform, scipy or matplotlib:
+#
+#    import acoustics
+#    Gxx,f,OASPL = acoustics.autospec(x,fs)      # imports acoustics.spectra only
+#    from acoustics import fractionalOctave      # imports acoustics.banding
+#
+#Plotting lives in acoustics.plotting, which imports matplotlib when a plot is made.
+import importlib
+
+__version__ = '0.2.0'
+
+# submodule holding every public name
+_NAMES = {
+    'loading': ['binfilename', 'binfileload', 'loadsession'],
+    'spectra': ['SpectralPlan', 'getplan', 'autospec', 'crossspec', 'crossspecmatrix', 'spectrogram',
+                'WelchAccumulator'],
+    'banding': ['octavebands', 'FilterBank', 'getfilterbank', 'fractionalOctave', 'multirateOctave'],
+    'weightings': ['weighting', 'WeightingFilter', 'weightedLeq'],
+    'beamforming': ['beamform', 'beamformsegments', 'csmbeamform'],
+    'soundpower': ['intensitypower', 'reverbpower'],
+    'levelmeter': ['SoundLevelMeter', 'RingBuffer', 'readframes'],
+    'catalog': ['DatasetCatalog', 'Channel'],
+    'packfile': ['pack', 'writepack', 'PackFile'],
+    'spectralcache': ['SpectralCache'],
+    'instrument': ['addobserver', 'removeobserver', 'stage', 'printer', 'Profiler'],
+    'plotting': ['plotspectrum', 'plotbands', 'plotbeam'],
+}
+_SUBMODULES = list(_NAMES) + ['batch']
+_WHERE = {name: module for module, names in _NAMES.items() for name in names}
+
+__all__ = sorted(_WHERE) + _SUBMODULES
+
+
+def __getattr__(name):
+    # PEP 562: import the submodule on first use and keep the name here, so
+    # later lookups are ordinary attribute accesses
+    if name in _SUBMODULES:
+        return importlib.import_module('.'+name, __name__)
+    if name in _WHERE:
+        value = getattr(importlib.import_module('.'+_WHERE[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError('module %r has no attribute %r' %(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,246 @@
+"""
+Resumable batch runner of spectral analyses over a manifest of recordings.
+
+call acoustics-batch manifest.json [--out results] [--workers 4] [--cache .spectralcache] [--restart]
+     (or python -m acoustics.batch ...)
+
+The manifest is a JSON file naming the recordings and the analyses to run
+on them (paths are relative to the manifest):
+
+{"recordings": {
+   "reverb1": {"path": "ReverbFiles", "IDname": "ID", "IDs": [1], "CHs": [0,1,2,3,4,5],
+               "fs": 102400, "N": -1, "NStart": 0, "dtype": "float32"},
+   "probe": {"pack": "side1.pack", "channels": [["ID",1,0], ["ID",1,1]]}},
+ "tasks": [
+   {"name": "reverb1-bands", "analysis": "fractionalOctave", "recording": "reverb1",
+    "params": {"ns": 32768, "flims": [100, 10000], "width": 3}},
+   {"analysis": "crossspec", "recording": "probe", "params": {"ns": 32768}}]}
+
+A recording is a set of ID###_###.bin files (as loadsession reads them) or
+a pack file (see packfile.py), optionally a selection of its channels, and
+is loaded by the worker that needs it.  The analyses and their outputs are
+
+autospec          Gxx, f, OASPL              params: ns, unitflag, overlap, window
+crossspec         Gxy, f (x = column 0, y = column 1, or params x, y)
+fractionalOctave  spec, fc, f, Gxx           params: ns, flims, width
+weighting         Gxx (weighted), f, level   params: ns, type, unitflag, overlap, window
+beamform          SPLvec, lookangles         params: d, lookangles (degrees: [start, stop, count]),
+                                             method, nfft
+
+Every task's outputs are written to <out>/<name>.npz, and its completion is
+appended to <out>/checkpoint.jsonl, so an interrupted run started again
+skips the tasks already done (unless their manifest entry changed, or
+--restart is given).  Tasks run across a pool of --workers processes; one
+that fails is reported and the rest go on, and the exit status is 1 if any
+failed.  Nothing is plotted.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .loading import loadsession
+from .weightings import weighting
+from .beamforming import beamform
+from .spectra import autospec, crossspec, getplan
+from .banding import fractionalOctave
+from .packfile import PackFile
+from .spectralcache import SpectralCache
+from . import instrument
+
+CHECKPOINT = 'checkpoint.jsonl'
+ANALYSES = ('autospec', 'crossspec', 'fractionalOctave', 'weighting', 'beamform')
+
+
+def loadrecording(recording, root):
+    """
+    x,fs = loadrecording(recording,root), the (N, channels) samples of a
+    manifest recording and their sampling frequency
+    """
+    dtype = np.dtype(recording.get('dtype', 'float64'))
+    N = recording.get('N', -1)
+    NStart = recording.get('NStart', 0)
+    if 'pack' in recording:
+        pk = PackFile(os.path.join(root, recording['pack']))
+        channels = recording.get('channels')
+        if channels is not None:
+            channels = [tuple(label) if isinstance(label, list) else label for label in channels]
+        stop = pk.N if N == -1 else NStart+N
+        return pk.read(NStart, stop, channels, dtype), pk.fs
+
+    x = loadsession(os.path.join(root, recording['path']), recording.get('IDname', 'ID'), recording['IDs'],
+                    recording['CHs'], N, NStart, dtype=dtype)
+    return x, recording['fs']
+
+
+def analyze(analysis, x, fs, params, dtype=float, cache=None):
+    """
+    outputs = analyze(analysis,x,fs,params,dtype=float,cache=None), dict of
+    the named outputs of one analysis of x
+    """
+    params = dict(params)
+    ns = params.pop('ns', 2**15)
+    if analysis == 'autospec':
+        Gxx, f, OASPL = autospec(x, fs, ns, dtype=dtype, cache=cache, **params)
+        return {'Gxx': Gxx, 'f': f, 'OASPL': OASPL}
+
+    if analysis == 'crossspec':
+        xi, yi = params.pop('x', 0), params.pop('y', 1)
+        Gxy, f = crossspec(x[:,xi], x[:,yi], fs, ns, dtype=dtype, cache=cache, **params)
+        return {'Gxy': Gxy, 'f': f}
+
+    if analysis == 'fractionalOctave':
+        flims = params.pop('flims', [2e1,2e4])
+        width = params.pop('width', 3)
+        Gxx, f, OASPL = autospec(x, fs, ns, dtype=dtype, cache=cache, **params)
+        spec, fc = fractionalOctave(f, Gxx, flims, width)
+        return {'spec': spec, 'fc': fc, 'f': f, 'Gxx': Gxx}
+
+    if analysis == 'weighting':
+        type = params.pop('type', 'A')
+        Gxx, f, OASPL = autospec(x, fs, ns, dtype=dtype, cache=cache, **params)
+        W = weighting(f, type)[0].reshape((-1,)+(1,)*(Gxx.ndim-1))
+        Gw = Gxx*W
+        plan = getplan(int(ns), fs, dtype=dtype)
+        return {'Gxx': Gw, 'f': f, 'level': plan.oaspl(Gw, params.get('unitflag', 0))}
+
+    if analysis == 'beamform':
+        start, stop, count = params.pop('lookangles', [0, 180, 181])
+        lookangles = np.linspace(start, stop, int(count))*np.pi/180
+        d = params.pop('d')
+        SPLvec, waveform = beamform([x[:,j] for j in range(x.shape[1])], fs, d, lookangles, dtype=dtype,
+                                    **params)
+        return {'SPLvec': SPLvec, 'lookangles': lookangles}
+
+    raise ValueError('unknown analysis %r' %analysis)
+
+
+def runtask(task, recording, root, out, cachedir=None):
+    """
+    Worker: loads the recording, runs one task and writes <out>/<name>.npz.
+    Returns the checkpoint entry.
+    """
+    start = time.perf_counter()
+    cache = SpectralCache(cachedir) if cachedir else None
+    x, fs = loadrecording(recording, root)
+    outputs = analyze(task['analysis'], x, fs, task.get('params', {}), x.dtype, cache)
+
+    filename = os.path.join(out, task['name'] + '.npz')
+    tmp = filename + '.%d.tmp' %os.getpid()
+    with open(tmp, 'wb') as fout:
+        np.savez(fout, **outputs)
+    os.replace(tmp, filename)
+    return {'name': task['name'], 'file': os.path.basename(filename), 'time': time.perf_counter() - start}
+
+
+def taskkey(task, recording):
+    # changes whenever the task or its recording is edited in the manifest
+    text = json.dumps([task, recording], sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+
+
+def readmanifest(filename):
+    """
+    recordings,tasks = readmanifest(filename), with every task named and checked
+    """
+    with open(filename) as fin:
+        manifest = json.load(fin)
+    recordings = manifest['recordings']
+    tasks = []
+    names = set()
+    for k, task in enumerate(manifest['tasks']):
+        task = dict(task)
+        if task.get('recording') not in recordings:
+            raise ValueError('task %d uses unknown recording %r' %(k, task.get('recording')))
+        if task.get('analysis') not in ANALYSES:
+            raise ValueError('task %d has unknown analysis %r, use one of %s' %(k, task.get('analysis'), ANALYSES))
+        task.setdefault('name', '%s-%s-%d' %(task['recording'], task['analysis'], k))
+        if task['name'] in names:
+            raise ValueError('two tasks are named %r' %task['name'])
+        names.add(task['name'])
+        tasks.append(task)
+    return recordings, tasks
+
+
+def readcheckpoint(filename):
+    """
+    done = readcheckpoint(filename), {name: key} of the completed tasks
+    """
+    done = {}
+    if not os.path.exists(filename):
+        return done
+    with open(filename) as fin:
+        for line in fin:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # a line cut short by an interruption
+                continue
+            done[entry['name']] = entry['key']
+    return done
+
+
+def run(args):
+    root = os.path.dirname(os.path.abspath(args.manifest))
+    recordings, tasks = readmanifest(args.manifest)
+    out = args.out or os.path.join(root, 'results')
+    os.makedirs(out, exist_ok=True)
+    checkpoint = os.path.join(out, CHECKPOINT)
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    if args.verbose:
+        instrument.addobserver(instrument.printer)
+
+    done = readcheckpoint(checkpoint)
+    todo = []
+    for task in tasks:
+        key = taskkey(task, recordings[task['recording']])
+        if done.get(task['name']) == key and os.path.exists(os.path.join(out, task['name'] + '.npz')):
+            continue
+        todo.append((task, key))
+    print('%d tasks, %d already done, %d to run' %(len(tasks), len(tasks)-len(todo), len(todo)))
+
+    failed = 0
+    with open(checkpoint, 'a') as log, ProcessPoolExecutor(args.workers) as pool:
+        jobs = {pool.submit(runtask, task, recordings[task['recording']], root, out, args.cache): (task, key)
+                for task, key in todo}
+        for k, job in enumerate(as_completed(jobs)):
+            task, key = jobs[job]
+            try:
+                entry = job.result()
+            except Exception:
+                failed += 1
+                print('[%d/%d] %s FAILED' %(k+1, len(todo), task['name']))
+                traceback.print_exc()
+                continue
+            entry['key'] = key
+            log.write(json.dumps(entry) + '\n')
+            log.flush()
+            os.fsync(log.fileno())
+            print('[%d/%d] %s done in %.2f s' %(k+1, len(todo), task['name'], entry['time']))
+
+    if failed:
+        print('%d tasks failed, run again to retry them' %failed)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('manifest', help='JSON manifest of recordings and tasks')
+    parser.add_argument('--out', help='directory for the results and checkpoint (default results/ next to the manifest)')
+    parser.add_argument('--workers', type=int, help='worker processes (default from concurrent.futures)')
+    parser.add_argument('--cache', help='SpectralCache directory shared by the workers')
+    parser.add_argument('--restart', action='store_true', help='forget the checkpoint and rerun every task')
+    parser.add_argument('--verbose', action='store_true', help='print the files read as they are opened')
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
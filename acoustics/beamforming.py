@@ -0,0 +1,415 @@
+#Module 'beamforming.py' contains beamform, beamformsegments and csmbeamform, the
+#delay-and-sum beamformers of line arrays
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import mmap
+from .banding import getfilterbank
+from .instrument import stage
+
+def _steertaus(channels, d, lookangles):
+    """
+    tau = _steertaus(channels,d,lookangles)
+    Exact delays (angle, channel), in seconds, for a line array with spacing
+    d steered to lookangles (radians, 90 deg is broadside).
+    """
+
+    ## speed of sound
+    c = 343.0
+
+    # shift it 90 degrees to get into my reference (90 deg is broadside),
+    # and shift channel j down by j*d*sin(theta)/c
+    theta = np.asarray(lookangles, dtype=float) - 90.0*np.pi/180.0
+    return np.arange(channels)[None,:]*d*np.sin(theta)[:,None]/c
+
+
+def _steerdelays(channels, fs, d, lookangles):
+    """
+    shifts,indices = _steerdelays(channels,fs,d,lookangles)
+    Integer delay table (angle, channel), in samples, for a line array with
+    spacing d steered to lookangles (radians, 90 deg is broadside), and the
+    number of samples, indices, trimmed from each end so no delay runs off
+    the data.  The first channel is never shifted.
+    """
+
+    ## speed of sound
+    c = 343.0
+
+    # maximum delay required (end fire incidence)
+    maxTau = (channels-1)*d/c   # (channels-1)*d is the max distance
+    dt = 1.0/fs   # time between samples
+    maxindices = maxTau/dt  # number of indices to reach max delay
+
+    # take the middle chunk of data so we never go too far when we delay
+    indices = int(round(maxindices)+18)
+
+    tau = _steertaus(channels, d, lookangles)
+    shifts = np.round(tau/dt).astype(int)
+
+    return shifts, indices
+
+
+def _beamformchunk(x, shifts, indices, m, tmp):
+    """
+    _beamformchunk(x,shifts,indices,m,tmp)
+    Delayed sums (mean over channels) for a chunk of look angles, written to
+    the rows of m, (angles, L), using tmp, (L,), as scratch.
+    """
+    channels = len(x)
+    L = m.shape[1]
+    for r in range(len(shifts)):
+        np.divide(x[0][indices:indices+L], float(channels), out=m[r])
+        for j in range(1, channels):
+            start = indices-shifts[r,j]
+            np.divide(x[j][start:start+L], float(channels), out=tmp)
+            m[r] += tmp
+
+
+def beamformsegments(x, fs, d, lookangles, nfft=2**14, dtype=float):
+    """
+    for start,y in beamformsegments(x,fs,d,lookangles,nfft=2**14,dtype=float): ...
+    Frequency-domain delay-and-sum beamforming with exact (sub-sample)
+    delays.  The data are cut into overlapping segments of nfft samples
+    (overlap-save); each channel of a segment is transformed once, a phase
+    ramp exp(-2j*pi*f*tau) is applied for every (angle, channel) at once,
+    and the inverse transforms of all angles are trimmed to the part free of
+    wrap-around.  Each step yields
+    y = (len(lookangles), n) steered outputs for output samples start:start+n
+    with the same sample alignment as beamform, so only one segment is in
+    memory at a time.  The phase ramps take len(lookangles)*len(x)*(nfft/2+1)
+    complex values, so very large sweeps should be given in chunks of angles.
+    x, fs, d, lookangles and dtype are as in beamform.
+    """
+
+    channels = len(x)
+    N = len(x[0])
+    shifts, indices = _steerdelays(channels, fs, d, lookangles)
+    tau = _steertaus(channels, d, lookangles)
+    L = N - 2*indices
+
+    # samples discarded at each end of a segment: the largest delay, and
+    # enough of the fractional delays' sinc tails to make wrap-around small
+    guard = max(indices, nfft//4)
+    hop = nfft - 2*guard
+    if hop < 1:
+        raise ValueError('nfft = %d is too short for delays of %d samples' %(nfft, indices))
+
+    # phase ramps (frequency, angle, channel), including the 1/channels of the mean
+    f = np.fft.rfftfreq(nfft, 1.0/fs)
+    P = np.exp(-2j*np.pi*f[:,None,None]*tau[None,:,:])/float(channels)
+    P = P.astype(np.result_type(dtype, np.complex64), copy=False)
+
+    # numpy's single precision FFT needs a float32 normalization factor, so
+    # float32 segments are transformed with norm='forward' and its 1/nfft is
+    # undone in the phase ramps (see SpectralPlan)
+    norm = None
+    if np.dtype(dtype) == np.float32:
+        norm = 'forward'
+        P *= nfft
+
+    seg = np.zeros((channels, nfft), dtype=dtype)
+    for start in range(0, L, hop):
+        n = min(hop, L-start)
+
+        # input samples of this segment, zero padded past the ends of x
+        lo = indices + start - guard
+        a, b = max(lo, 0), min(lo+nfft, N)
+        seg[:] = 0
+        for j in range(channels):
+            seg[j,a-lo:b-lo] = x[j][a:b]
+
+        # one transform per channel, then delay and sum every angle
+        X = np.fft.rfft(seg, norm=norm)
+        Y = np.matmul(P, X.T[:,:,None])[:,:,0]
+        y = np.fft.irfft(Y.T, nfft)
+
+        yield start, y[:,guard:guard+n]
+
+
+def _beamformtask(x, task, buffers):
+    """
+    SPL,waves = _beamformtask(x,task,buffers)
+    One chunk of beamform: task is ('time', shifts, indices, dtype, keep) or
+    ('frequency', fs, d, lookangles, nfft, dtype, keep), and waves holds the
+    waveforms of the chunk's rows listed in keep.  buffers keeps the output
+    and scratch arrays between chunks.
+    """
+    pref = 2e-5
+    method, keep = task[0], task[-1]
+
+    if method == 'time':
+        shifts, indices, dtype = task[1:4]
+        L = len(x[0]) - 2*indices
+        n = len(shifts)
+        m = buffers.get('m')
+        if m is None or m.shape[0] < n or m.shape[1] != L or m.dtype != dtype:
+            buffers['m'] = np.empty((n, L), dtype=dtype)
+            buffers['tmp'] = np.empty(L, dtype=dtype)
+        m = buffers['m'][:n]
+        _beamformchunk(x, shifts, indices, m, buffers['tmp'])
+
+        waves = {row: m[row].copy() for row in keep}
+        SPL = 20*np.log10(np.mean(np.square(m,out=m),axis=1,dtype=float)/pref**2)
+
+    else:
+        fs, d, lookangles, nfft, dtype = task[1:6]
+        shifts, indices = _steerdelays(len(x), fs, d, lookangles)
+        L = len(x[0]) - 2*indices
+        sumsq = np.zeros(len(lookangles))
+        waves = {}
+        for start, y in beamformsegments(x, fs, d, lookangles, nfft, dtype):
+            sumsq += np.sum(y**2,axis=1,dtype=float)
+            for row in keep:
+                waves.setdefault(row, []).append(y[row])
+        waves = {row: np.concatenate(w) for row, w in waves.items()}
+        SPL = 20*np.log10(sumsq/L/pref**2)
+
+    return SPL, waves
+
+
+def _beamformcollect(results, starts, rows, wanted, waveform, st):
+    """
+    SPL = _beamformcollect(results,starts,rows,wanted,waveform,st)
+    Gathers the chunk results of _beamformtask, in chunk order, into the
+    SPL of every row and the desired waveforms, reporting each chunk as
+    progress of the stage st.
+    """
+    SPL = []
+    for start, (chunk, waves) in zip(starts, results):
+        SPL.append(chunk)
+        for k, row in enumerate(wanted):
+            if row >= 0 and rows[row]-start in waves:
+                waveform[k] = waves[rows[row]-start]
+        st.progress(len(SPL), len(starts))
+
+    return np.concatenate(SPL) if SPL else np.zeros(0)
+
+
+def _sharechannels(x):
+    """
+    source,shm = _sharechannels(x)
+    Describes the channels x for the beamform workers: memmapped channels
+    (binfileload(..., mmap=True)) are reopened from their files, anything
+    else is copied once into shared memory, shm, which the caller unlinks.
+    The channels keep their own precision (they all have one dtype, see
+    beamform), so the workers compute exactly what the serial path does.
+    """
+    if all(isinstance(xj, np.memmap) and isinstance(xj.base, mmap.mmap) for xj in x):
+        return ('memmap', [(xj.filename, xj.offset, xj.dtype.str, xj.shape) for xj in x]), None
+
+    shape = (len(x), len(x[0]))
+    dtype = np.asarray(x[0]).dtype
+    shm = shared_memory.SharedMemory(create=True, size=dtype.itemsize*shape[0]*shape[1])
+    data = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    for j in range(shape[0]):
+        data[j] = x[j]
+    del data
+
+    return ('shm', shm.name, shape, dtype.str), shm
+
+
+_WORKER = {}
+
+def _beamforminit(source):
+    # attach a worker process to the channels described by _sharechannels
+    if source[0] == 'memmap':
+        _WORKER['x'] = [np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape)
+                        for filename, offset, dtype, shape in source[1]]
+    else:
+        _WORKER['shm'] = shared_memory.SharedMemory(name=source[1])
+        _WORKER['x'] = np.ndarray(source[2], dtype=source[3], buffer=_WORKER['shm'].buf)
+
+
+def _beamformworker(task):
+    return _beamformtask(_WORKER['x'], task, _WORKER)
+
+
+def beamform(x, fs, d, lookangles, desiredangle=None, maxbytes=2**25, method='time', nfft=2**14, workers=None,
+             dtype=float):
+    """
+    SPLvec,waveform = beamform(x,fs,d,lookangles,desiredangle=None,maxbytes=2**25,method='time',nfft=2**14,workers=None,
+                               dtype=float)
+    x is a list signals   x = [x1(t),x2(t),x3(t),...]  (or an (M, N) array)
+    fs is the sampling frequency of the signals
+    d is the spacing between microphones, in meters
+    lookangles is an array of look angles, in radians
+    desiredangle is a look angle, or a sequence of them, in degrees whose
+    delay-and-sum waveform is returned: one angle gives its waveform (None if
+    it is not in lookangles), a sequence gives a (len(desiredangle), L) array.
+    maxbytes bounds the memory used for the steered outputs at once.
+    The integer delays for every (angle, channel) are computed up front, and
+    angles that round to the same delays share one delayed sum, so the cost
+    is bounded by the number of distinct delay patterns rather than the
+    number of look angles.  The outputs are computed in memory-bounded
+    chunks of delay patterns.
+    method = 'time' rounds every delay to a whole sample as above.
+    method = 'frequency' applies the exact delays as phase ramps instead (see
+    beamformsegments), in segments of nfft samples and chunks of look
+    angles bounded by maxbytes, so no oversampling is needed for accurate
+    steering.
+    workers > 1 spreads the chunks over that many processes, cutting them
+    small enough that every worker has at least one; the channels are shared
+    with them through shared memory (memmapped channels from
+    binfileload(..., mmap=True) are reopened from their files instead), and
+    the results are gathered in angle order, identical to workers=None.
+    The angles, distinct delays, buffer size, time and the progress of every
+    chunk are reported to observers (see instrument.py).
+    dtype = np.float32 forms the delayed sums (and, for method='frequency',
+    the transforms) in float32/complex64, at half the memory per chunk, and
+    accumulates the SPL in float64; against the float64 path SPLvec differs
+    by about 1e-6 dB and waveform by about 1e-6 relative.
+    The function assumes a speed of sound of 343 m/s
+    """
+
+    lookangles = np.atleast_1d(np.asarray(lookangles, dtype=float))
+
+    # channels of different types are promoted to one up front, so the
+    # workers, which share them as one array, see the same samples
+    types = [np.asarray(xj[:0]).dtype for xj in x]
+    if len(set(types)) > 1:
+        x = [np.asarray(xj, dtype=np.result_type(*types)) for xj in x]
+
+    # number of signals in the list x
+    channels = len(x)
+    shifts, indices = _steerdelays(channels, fs, d, lookangles)
+    L = len(x[0]) - 2*indices
+
+    # rows of lookangles holding the desired angles
+    wanted = []
+    if desiredangle is not None:
+        for angle in np.atleast_1d(desiredangle):
+            match = np.flatnonzero(np.isclose(lookangles, angle*np.pi/180))
+            if len(match) == 0 and np.ndim(desiredangle):
+                raise ValueError('desired angle %g is not one of the look angles' %angle)
+            wanted.append(match[0] if len(match) else -1)
+    waveform = np.zeros((len(wanted), L), dtype=dtype) if wanted else None
+
+    if method == 'frequency':
+        # look angles per chunk: phase ramps, spectra and outputs of a segment
+        itemsize = np.dtype(dtype).itemsize
+        perrow = (channels+2)*(nfft//2+1)*2*itemsize + nfft*itemsize
+        step = max(1, int(maxbytes//perrow))
+
+        rows = np.arange(len(lookangles))
+        nrows = len(lookangles)
+        info = {'angles': len(lookangles)}
+
+    elif method == 'time':
+        # dense sweeps round many angles to the same delays, so each distinct
+        # row of the delay table is only summed once
+        shifts, rows = np.unique(shifts, axis=0, return_inverse=True)
+        rows = rows.reshape(-1)
+
+        # distinct delays per chunk, bounded by the memory for their outputs
+        perrow = np.dtype(dtype).itemsize*L
+        step = max(1, int(maxbytes//perrow))
+
+        nrows = len(shifts)
+        info = {'angles': len(lookangles), 'delays': len(shifts)}
+
+    else:
+        raise ValueError("method must be 'time' or 'frequency', not %r" %method)
+
+    # with workers, no chunk takes more than its share of the rows, so none
+    # of them sits idle while short sweeps or records fit in a few chunks
+    if workers is not None and workers > 1:
+        step = min(step, max(1, nrows//workers))
+    info['peakbuffer'] = perrow*min(step, nrows)
+
+    starts = list(range(0, nrows, step))
+    if method == 'frequency':
+        tasks = [('frequency', fs, d, lookangles[start:start+step], nfft, dtype) for start in starts]
+    else:
+        tasks = [('time', shifts[start:start+step], indices, dtype) for start in starts]
+
+    # each chunk also returns the waveforms of the desired rows it holds
+    tasks = [task + ([rows[row]-start for row in wanted if row >= 0 and start <= rows[row] < start+step],)
+             for task, start in zip(tasks, starts)]
+
+    with stage('beamform', method=method, chunks=len(tasks), **info) as st:
+        if workers is None or workers <= 1:
+            # output and scratch buffers reused by every chunk
+            buffers = {}
+            results = (_beamformtask(x, task, buffers) for task in tasks)
+            SPL = _beamformcollect(results, starts, rows, wanted, waveform, st)
+        else:
+            # the workers read the channels from shared memory (or reopen the
+            # memmapped files) instead of receiving a pickled copy each
+            source, shm = _sharechannels(x)
+            try:
+                with ProcessPoolExecutor(workers, initializer=_beamforminit, initargs=(source,)) as pool:
+                    results = pool.map(_beamformworker, tasks)
+                    SPL = _beamformcollect(results, starts, rows, wanted, waveform, st)
+            finally:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+
+    SPLvec = SPL[rows]
+
+    if desiredangle is not None and not np.ndim(desiredangle):
+        waveform = waveform[0] if wanted[0] >= 0 else None
+
+    return SPLvec,waveform
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def csmbeamform(Gxy, f, d, lookangles, flims=[2e1,2e4], width=3, maxbytes=2**25):
+    """
+    B,fc = csmbeamform(Gxy,f,d,lookangles,flims=[2e1,2e4],width=3,maxbytes=2**25)
+    Conventional (delay-and-sum) beamforming of a cross-spectral matrix in
+    fractional-octave bands.  The matrix is band-summed with the
+    fractionalOctave filter masks, and each band is steered at its exact
+    center frequency fce with w_j = exp(-2j*pi*fce*tau_j)/M:
+    B[band, angle] = w^H G w.  Once the matrix exists the cost is
+    bands*angles*M**2 regardless of the recording length.
+    Inputs:   Gxy - cross-spectral matrix (len(f), M, M) from crossspecmatrix
+    (unitflag=0), with channel j at j*d along the array as in beamform
+    f - frequency array (Hz)
+    d - spacing between microphones, in meters
+    lookangles - array of look angles, in radians (90 deg is broadside)
+    flims, width - bands, as in fractionalOctave
+    maxbytes - bounds the memory of the steering vectors at once
+    Outputs:  B, band power of the steered array output (Eng Units**2),
+    (len(fc), len(lookangles)); 10*np.log10(B/2e-5**2) is its level in dB
+    fc, preferred band center frequencies
+    Steering at the center frequency smears the beam over the band, more so
+    for octaves than for narrow bands.
+    The function assumes a speed of sound of 343 m/s
+    """
+
+    Gxy = np.asarray(Gxy)
+    lookangles = np.atleast_1d(np.asarray(lookangles, dtype=float))
+    channels = Gxy.shape[1]
+
+    # band-summed cross-spectral matrices (bands, M, M)
+    bank = getfilterbank(f,flims,width)
+    G = bank.apply(Gxy)
+
+    tau = _steertaus(channels, d, lookangles)
+
+    # look angles per chunk, bounded by the steering vectors and products
+    step = max(1, int(maxbytes//(2*16*len(G)*channels)))
+
+    B = np.zeros((len(G), len(lookangles)))
+    for start in range(0, len(lookangles), step):
+        # steering vectors (bands, angles, M)
+        w = np.exp(-2j*np.pi*bank.fcexact[:,None,None]*tau[None,start:start+step,:])/float(channels)
+
+        # w^H G w for every band and angle: (G w)_i, then sum conj(w_i) (G w)_i
+        Gw = np.matmul(w, G.transpose(0,2,1))
+        B[:,start:start+step] = np.real(np.sum(np.conjugate(w)*Gw, axis=2))
+
+    return B,bank.fc
@@ -0,0 +1,188 @@
+#Module 'catalog.py' contains DatasetCatalog, an index of the ID###_###.bin files of
+#a measurement directory kept in a sidecar file, and Channel, a lazy handle to one file
+import numpy as np
+import os
+import re
+import json
+from .loading import binfileload, loadsession
+
+# file names as written by the recorder and read by binfileload, e.g. ID001_003.bin
+PATTERN = r'(?P<IDname>.*?)(?P<ID>\d{3})_(?P<CH>\d{3})\.bin'
+SIDECAR = '.catalog.json'
+
+
+class Channel:
+    """
+    ch = catalog.channel(ID,CH,IDname='ID')
+    Handle to one channel file that reads nothing until asked.
+    len(ch) = number of samples in the file
+    x = ch[a:b:step] reads samples a to b (any slice, also with a negative
+    step) as float64, seeking straight to the first sample it needs, so
+    pieces of long recordings cost only their own size
+    x = ch.read(N=-1,NStart=0,dtype=float), as binfileload
+    x = ch.memmap(), read-only float32 memmap of the whole file
+    ch.filename, ch.IDname, ch.ID, ch.CH and ch.N describe the file.
+    """
+
+    def __init__(self, path, IDname, ID, CH, N):
+        self.path = path
+        self.IDname = IDname
+        self.ID = ID
+        self.CH = CH
+        self.N = N
+        self.filename = os.path.join(path, '%s%03d_%03d.bin' %(IDname, ID, CH))
+
+    def __len__(self):
+        return self.N
+
+    def __repr__(self):
+        return 'Channel(%r, N=%d)' %(self.filename, self.N)
+
+    def read(self, N=-1, NStart=0, dtype=float):
+        return binfileload(self.path, self.IDname, self.ID, self.CH, N, NStart, dtype=dtype)
+
+    def memmap(self):
+        return binfileload(self.path, self.IDname, self.ID, self.CH, mmap=True)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('index a Channel with a slice, e.g. ch[a:b]')
+        # read the span covering the samples, lowest first, then step
+        # through it (backwards for a negative step)
+        r = range(*index.indices(self.N))
+        if len(r) == 0:
+            return np.zeros(0)
+        lo = min(r[0], r[-1])
+        x = self.read(abs(r[-1]-r[0])+1, lo)
+        return x[r[0]-lo::r.step]
+
+
+class DatasetCatalog:
+    """
+    catalog = DatasetCatalog(path,pattern=PATTERN,refresh=False)
+    Index of every (IDname, ID, channel) recording in the directory path with
+    its number of samples (from the file size, 4 bytes per sample), built
+    with one directory listing and kept in the sidecar file path/.catalog.json.
+    Later catalogs of the same directory load the sidecar instead of listing
+    it again, as long as the directory has not changed since (files added,
+    removed or renamed); refresh=True, or catalog.refresh(), rescans anyway,
+    e.g. after files have grown.  If the sidecar cannot be written the index
+    is simply kept in memory.
+    pattern = regular expression for the file names, with the groups IDname,
+    ID and CH; other files are ignored.
+    catalog.idnames() = the IDnames present, e.g. ['ID']
+    catalog.ids(IDname='ID') = sorted ID numbers
+    catalog.channels(ID,IDname='ID') = sorted channel numbers of an ID
+    catalog.samples(ID,CH,IDname='ID') = samples in one file
+    catalog.shortest(IDs=None,CHs=None,IDname='ID') = fewest samples in a
+    selection of files, the N that loadsession can read from all of them
+    catalog.channel(ID,CH,IDname='ID') = lazy Channel handle to one file
+    catalog.select(IDs=None,CHs=None,IDname='ID') = Channels of a selection
+    x = catalog.load(IDs=None,CHs=None,IDname='ID',N=-1,NStart=0,dtype=float)
+    loads a selection with loadsession.
+    IDs and CHs of None select everything present.  len(catalog) is the
+    number of files, and iterating gives the (IDname, ID, CH) keys in order.
+    """
+
+    def __init__(self, path, pattern=PATTERN, refresh=False):
+        self.path = path
+        self.pattern = pattern
+        self.sidecar = os.path.join(path, SIDECAR)
+        self.index = None
+        if not refresh:
+            self.index = self._load()
+        if self.index is None:
+            self.refresh()
+
+    def _load(self):
+        # the saved index, if the directory has not changed since it was written
+        try:
+            if os.stat(self.path).st_mtime_ns > os.stat(self.sidecar).st_mtime_ns:
+                return None
+            with open(self.sidecar) as fin:
+                saved = json.load(fin)
+        except (OSError, ValueError):
+            return None
+        if saved.get('pattern') != self.pattern:
+            return None
+        return {(IDname, ID, CH): N for IDname, ID, CH, N in saved['files']}
+
+    def refresh(self):
+        """
+        catalog.refresh(), lists the directory again and rewrites the sidecar
+        """
+        regex = re.compile(self.pattern)
+        index = {}
+        for entry in os.scandir(self.path):
+            match = regex.fullmatch(entry.name)
+            if match and entry.is_file():
+                key = (match.group('IDname'), int(match.group('ID')), int(match.group('CH')))
+                index[key] = entry.stat().st_size//4
+        self.index = dict(sorted(index.items()))
+
+        try:
+            tmp = self.sidecar + '.%d.tmp' %os.getpid()
+            with open(tmp, 'w') as fout:
+                json.dump({'pattern': self.pattern,
+                           'files': [list(key)+[N] for key, N in self.index.items()]}, fout)
+            os.replace(tmp, self.sidecar)
+            # the rename changes the directory, so mark the sidecar as newer
+            os.utime(self.sidecar)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def idnames(self):
+        return sorted({key[0] for key in self.index})
+
+    def ids(self, IDname='ID'):
+        return sorted({ID for name, ID, CH in self.index if name == IDname})
+
+    def channels(self, ID, IDname='ID'):
+        return sorted(CH for name, i, CH in self.index if name == IDname and i == ID)
+
+    def samples(self, ID, CH, IDname='ID'):
+        try:
+            return self.index[(IDname, ID, CH)]
+        except KeyError:
+            raise KeyError('no file %s%03d_%03d.bin in %s' %(IDname, ID, CH, self.path)) from None
+
+    def _keys(self, IDs, CHs, IDname):
+        # (IDname, ID, CH) of a selection; every requested file must exist
+        if IDs is None:
+            IDs = self.ids(IDname)
+        keys = []
+        for ID in IDs:
+            for CH in (self.channels(ID, IDname) if CHs is None else CHs):
+                self.samples(ID, CH, IDname)
+                keys.append((IDname, ID, CH))
+        return keys
+
+    def shortest(self, IDs=None, CHs=None, IDname='ID'):
+        keys = self._keys(IDs, CHs, IDname)
+        if not keys:
+            raise ValueError('no %s files selected in %s' %(IDname, self.path))
+        return min(self.index[key] for key in keys)
+
+    def channel(self, ID, CH, IDname='ID'):
+        return Channel(self.path, IDname, ID, CH, self.samples(ID, CH, IDname))
+
+    def select(self, IDs=None, CHs=None, IDname='ID'):
+        return [Channel(self.path, *key, self.index[key]) for key in self._keys(IDs, CHs, IDname)]
+
+    def load(self, IDs=None, CHs=None, IDname='ID', N=-1, NStart=0, dtype=float):
+        if IDs is None:
+            IDs = self.ids(IDname)
+        if CHs is None:
+            CHs = sorted({key[2] for key in self._keys(IDs, None, IDname)})
+        if N == -1:
+            N = self.shortest(IDs, CHs, IDname) - NStart
+        return loadsession(self.path, IDname, IDs, CHs, N, NStart, dtype=dtype)
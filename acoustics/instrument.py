@@ -0,0 +1,167 @@
+#Module 'instrument.py' contains the observers of the loading, spectral and
+#beamforming functions: addobserver, removeobserver, stage, printer and
+#Profiler
+import threading
+import time
+
+# callables observer(event, name, info) told about every stage; while it is
+# empty the instrumented functions do no more than check it
+_observers = []
+_lock = threading.Lock()
+
+
+def addobserver(observer):
+    """
+    addobserver(observer)
+    Calls observer(event, name, info) from now on, where event is 'start' or
+    'end' of a stage or 'progress' within one, name is the stage (e.g.
+    'binfileload', 'autospec', 'beamform') and info is a dict of its
+    details: 'time' (s) at the end, and counters such as 'bytes', 'files',
+    'blocks', 'ffts', 'angles' and 'peakbuffer' (bytes of the largest work
+    buffer).
+    """
+    with _lock:
+        _observers.append(observer)
+
+
+def removeobserver(observer):
+    """
+    removeobserver(observer), undoes addobserver
+    """
+    with _lock:
+        _observers.remove(observer)
+
+
+def _emit(event, name, info):
+    for observer in list(_observers):
+        observer(event, name, info)
+
+
+class _Stage:
+    # a stage being observed; add() records counters that are reported,
+    # along with the wall time, when it ends
+    def __init__(self, name, info):
+        self.name = name
+        self.info = info
+
+    def __enter__(self):
+        _emit('start', self.name, self.info)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.info['time'] = time.perf_counter() - self.start
+        _emit('end', self.name, self.info)
+        return False
+
+    def add(self, **counters):
+        for key, value in counters.items():
+            if key.startswith('peak'):
+                self.info[key] = max(self.info.get(key, 0), value)
+            else:
+                self.info[key] = self.info.get(key, 0) + value
+
+    def progress(self, done, total):
+        _emit('progress', self.name, {'done': done, 'total': total})
+
+
+class _NoStage:
+    # stands in for _Stage when nothing is observing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counters):
+        pass
+
+    def progress(self, done, total):
+        pass
+
+_NOSTAGE = _NoStage()
+
+
+def stage(name, **info):
+    """
+    with stage(name,**info) as st: ... st.add(bytes=n) ... st.progress(k,total)
+    Reports the start, progress and end of a stage to the observers, or does
+    nothing at all when there are none.
+    """
+    if not _observers:
+        return _NOSTAGE
+    return _Stage(name, info)
+
+
+def printer(event, name, info):
+    """
+    addobserver(printer) prints what the functions used to print: the files
+    being opened and read, their throughput and the beamforming progress.
+    """
+    if name == 'binfileload' and event == 'start':
+        print('opening ',info['file'])
+    elif name == 'loadsession' and event == 'start':
+        print('loading %d files from %s' %(info['files'], info['path']))
+    elif name == 'loadsession' and event == 'end':
+        megabytes = info['bytes']/1e6
+        print('read %.1f MB in %.2f s (%.1f MB/s)' %(megabytes, info['time'], megabytes/max(info['time'], 1e-9)))
+    elif name == 'beamform' and event == 'start':
+        if 'delays' in info:
+            print('beamforming %d angles (%d distinct delays)...' %(info['angles'], info['delays']))
+        else:
+            print('beamforming %d angles...' %info['angles'])
+    elif name == 'beamform' and event == 'progress':
+        print("#",end="", flush=True)
+    elif name == 'beamform' and event == 'end':
+        print()
+    elif name == 'intensitypower' and event == 'start':
+        print("Calculating Intensity of %d IDs..." %info['IDs'])
+
+
+class Profiler:
+    """
+    with Profiler() as prof: ...
+    Observes every stage while the block runs, keeping per stage the number
+    of calls, the total wall time, the sums of the counters ('bytes',
+    'blocks', 'ffts', ...) and the largest 'peakbuffer'.
+    prof.stages = {name: {'calls', 'time', ...}}
+    print(prof.report()) tabulates them, slowest first.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event, name, info):
+        if event != 'end':
+            return
+        with self._lock:
+            totals = self.stages.setdefault(name, {'calls': 0})
+            totals['calls'] += 1
+            for key, value in info.items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                if key.startswith('peak'):
+                    totals[key] = max(totals.get(key, 0), value)
+                else:
+                    totals[key] = totals.get(key, 0) + value
+
+    def __enter__(self):
+        addobserver(self)
+        return self
+
+    def __exit__(self, *exc):
+        removeobserver(self)
+        return False
+
+    def report(self):
+        """
+        Table of the stages, slowest first.
+        """
+        lines = ['%-18s %6s %10s %10s %10s %8s %12s' %('stage', 'calls', 'time (s)', 'MB read',
+                                                      'blocks', 'ffts', 'peak buf MB')]
+        for name, totals in sorted(self.stages.items(), key=lambda item: -item[1].get('time', 0)):
+            lines.append('%-18s %6d %10.4f %10.1f %10d %8d %12.1f' %(
+                name, totals['calls'], totals.get('time', 0), totals.get('bytes', 0)/1e6,
+                totals.get('blocks', 0), totals.get('ffts', 0), totals.get('peakbuffer', 0)/1e6))
+        return '\n'.join(lines)
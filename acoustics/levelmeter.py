@@ -0,0 +1,268 @@
+#Module 'levelmeter.py' contains SoundLevelMeter, a streaming meter of time-weighted
+#overall and fractional-octave band levels, its RingBuffer and readframes, which
+#cuts a byte stream (a socket, a pipe or a growing file) into frames of samples
+import numpy as np
+import time
+from .weightings import weighting, WeightingFilter
+from .spectra import getplan
+from .banding import getfilterbank
+
+# reference pressure
+pref = 2e-5
+
+# exponential time constants (s) of the time weightings: Fast, Slow and
+# Impulse, whose fast rise is followed by a slow decay
+_TIMECONSTANTS = {'F': 0.125, 'S': 1.0, 'I': 0.035}
+_IMPULSEDECAY = 1.5
+
+
+class RingBuffer:
+    """
+    ring = RingBuffer(size,channels=None,dtype=float)
+    Keeps the last size samples pushed into it, (size,) or (size, channels),
+    in a fixed array, so pushing a frame costs only its own length.
+    ring.push(x) adds a frame (n,) or (n, channels) of any length
+    x = ring.latest(n=None,out=None), copy of the last n (default size)
+    samples in time order, zeros before the first push
+    ring.count = number of samples pushed so far
+    """
+
+    def __init__(self, size, channels=None, dtype=float):
+        self.size = int(size)
+        shape = (self.size,) if channels is None else (self.size, channels)
+        self.data = np.zeros(shape, dtype=dtype)
+        self.pos = 0
+        self.count = 0
+
+    def push(self, x):
+        x = np.asarray(x)
+        if len(x) >= self.size:
+            self.data[:] = x[-self.size:]
+            self.pos = 0
+        else:
+            n = min(len(x), self.size-self.pos)
+            self.data[self.pos:self.pos+n] = x[:n]
+            self.data[:len(x)-n] = x[n:]
+            self.pos = (self.pos + len(x)) % self.size
+        self.count += len(x)
+
+    def latest(self, n=None, out=None):
+        if n is None:
+            n = self.size
+        if out is None:
+            out = np.empty((n,)+self.data.shape[1:], dtype=self.data.dtype)
+        start = (self.pos - n) % self.size
+        first = min(n, self.size-start)
+        out[:first] = self.data[start:start+first]
+        out[first:] = self.data[:n-first]
+        return out
+
+
+def _peakdecay(z, y0, d):
+    """
+    y = _peakdecay(z,y0,d)
+    Peak detector y[n] = max(z[n], d*y[n-1]) with y[-1] = y0, in closed form:
+    y[n] = d**n * max(y0*d, max_k<=n z[k]*d**-k), taken in logarithms so that
+    d**-k cannot overflow.
+    """
+    k = np.arange(1, len(z)+1).reshape((-1,)+(1,)*(z.ndim-1))
+    logd = np.log(d)
+    with np.errstate(divide='ignore'):
+        logz = np.log(z) - (k-1)*logd
+        logy0 = np.log(y0) + logd
+    return np.exp(np.maximum(np.maximum.accumulate(logz, axis=0), logy0) + (k-1)*logd)
+
+
+class SoundLevelMeter:
+    """
+    meter = SoundLevelMeter(fs,frame=2**12,ns=2**14,type='A',timeweighting='F',
+                            flims=[2e1,2e4],width=3,channels=None)
+    Real-time sound level meter for live sources.  Frames of samples (in Pa)
+    are given to meter.update(x) as they arrive and after each one the meter
+    holds the current time-weighted levels:
+    meter.L = overall weighted level (dB re 20 uPa) at the end of the frame
+    meter.Lmax = largest overall level since the start (or meter.reset())
+    meter.Leq = weighted equivalent continuous level since the start
+    meter.Lbands = weighted band levels, (len(fc),) or (len(fc), channels)
+    meter.fc = preferred band center frequencies, as in fractionalOctave
+    meter.t = time (s) since the start
+    L,Lbands = meter.update(x) also returns them, and
+    for t,L,Lbands in meter.run(frames): ...
+    meters an iterable of frames, e.g. readframes(stream,frame).
+    The overall level is weighted in the time domain with WeightingFilter
+    (type 'A', 'C' or 'ITUR468', or 'Z' for none), squared and exponentially
+    averaged sample by sample with the time constant of timeweighting: 'F'
+    (Fast, 125 ms), 'S' (Slow, 1 s) or 'I' (Impulse, 35 ms rise and 1.5 s
+    decay).  The bands are the fractional-octave bands of the autospectrum of
+    the last ns samples (Hanning window), kept in a RingBuffer and weighted
+    by the weighting(f,type) curve, recomputed after every frame and averaged
+    over frames with the same time constants, so they also reflect the ns/fs
+    second window.  Every update costs one WeightingFilter pass and a
+    few vector operations over the frame plus one ns-point FFT and banding,
+    whatever the length of the session, so the per-frame latency is bounded.
+    Frames may have any length up to ns; frame only sets the default.
+    Inputs:
+    fs = sampling frequency
+    frame = samples per frame
+    ns = samples in the band analysis window
+    type = frequency weighting
+    timeweighting = 'F', 'S' or 'I'
+    flims, width = bands, as in fractionalOctave
+    channels = None for (n,) frames, or the number of columns of (n, M) frames
+    """
+
+    def __init__(self, fs, frame=2**12, ns=2**14, type='A', timeweighting='F', flims=[2e1,2e4], width=3,
+                 channels=None):
+        from scipy import signal
+
+        self.fs = fs
+        self.frame = int(frame)
+        self.ns = int(ns)
+        self.type = type.upper()
+        self.timeweighting = timeweighting.upper()
+        if self.timeweighting not in _TIMECONSTANTS:
+            raise ValueError('Unknown time weighting %r, use F, S or I' %timeweighting)
+        if self.frame > self.ns:
+            raise ValueError('frame = %d is longer than the band window ns = %d' %(self.frame, self.ns))
+        self.channels = channels
+        self._signal = signal
+
+        # frequency weighting of the time series and of the spectra
+        self.plan = getplan(self.ns, fs)
+        self.bank = getfilterbank(self.plan.f, flims, width)
+        self.fc = self.bank.fc
+        self.wf = None
+        self.W = np.ones(self.plan.nf)
+        if self.type != 'Z':
+            self.wf = WeightingFilter(fs, self.type)
+            self.W = weighting(self.plan.f, self.type)[0]
+        if channels is not None:
+            self.W = self.W[:,None]
+
+        # per sample smoothing of the squared signal
+        self.tau = _TIMECONSTANTS[self.timeweighting]
+        self.a = np.exp(-1/(self.tau*fs))
+        self.decay = np.exp(-1/(_IMPULSEDECAY*fs))
+
+        self._block = np.empty((self.ns,) if channels is None else (self.ns, channels))
+        self.reset()
+
+    def reset(self):
+        """
+        meter.reset(), start over
+        """
+        shape = () if self.channels is None else (self.channels,)
+        if self.wf is not None:
+            self.wf.reset()
+        self.ring = RingBuffer(self.ns, self.channels)
+        self.zi = None
+        self.ms = np.zeros(shape)
+        self.msbands = None
+        self.total = np.zeros(shape)
+        self.count = 0
+        self.t = 0.
+        self.L = np.full(shape, -np.inf)
+        self.Lmax = np.full(shape, -np.inf)
+        self.Leq = np.full(shape, -np.inf)
+        self.Lbands = np.full((len(self.fc),)+shape, -np.inf)
+
+    def _overall(self, y):
+        # exponentially averaged squared signal, one sample at a time, with the
+        # filter state carried between frames
+        y2 = y**2
+        b, a = [1-self.a], [1, -self.a]
+        if self.zi is None:
+            # start from the mean square of the first frame
+            self.zi = (self.a*np.mean(y2, axis=0))[None]
+        ms, self.zi = self._signal.lfilter(b, a, y2, axis=0, zi=self.zi)
+        if self.timeweighting == 'I':
+            ms = _peakdecay(ms, self.ms, self.decay)
+        self.ms = ms[-1]
+        return np.max(ms, axis=0)
+
+    def _bands(self, n):
+        # band mean squares of the analysis window, averaged over frames
+        block = self.ring.latest(out=self._block)
+        Gxx = self.plan.autospec(block)[0]
+        msbands = self.bank.apply(Gxx*self.W)
+        if self.msbands is None:
+            self.msbands = msbands
+        elif self.timeweighting == 'I':
+            rise = msbands > self.msbands
+            a = np.where(rise, np.exp(-n/(self.tau*self.fs)), np.exp(-n/(_IMPULSEDECAY*self.fs)))
+            self.msbands = np.where(rise, a*self.msbands + (1-a)*msbands, np.maximum(msbands, a*self.msbands))
+        else:
+            a = np.exp(-n/(self.tau*self.fs))
+            self.msbands = a*self.msbands + (1-a)*msbands
+
+    def update(self, x):
+        """
+        L,Lbands = meter.update(x), meters the next frame of samples
+        """
+        x = np.asarray(x, dtype=float)
+        n = len(x)
+        if n > self.ns:
+            raise ValueError('frame of %d samples is longer than the band window ns = %d' %(n, self.ns))
+
+        y = x if self.wf is None else self.wf.filter(x)
+        peak = self._overall(y)
+        self.total += np.sum(y**2, axis=0)
+        self.count += n
+        self.t += n/self.fs
+
+        self.ring.push(x)
+        self._bands(n)
+
+        with np.errstate(divide='ignore'):
+            self.L = 10*np.log10(self.ms/pref**2)
+            self.Lmax = np.maximum(self.Lmax, 10*np.log10(peak/pref**2))
+            self.Leq = 10*np.log10(self.total/self.count/pref**2)
+            self.Lbands = 10*np.log10(self.msbands/pref**2)
+        return self.L, self.Lbands
+
+    def run(self, frames):
+        """
+        for t,L,Lbands in meter.run(frames), meters every frame as it arrives
+        """
+        for x in frames:
+            L, Lbands = self.update(x)
+            yield self.t, L, Lbands
+
+
+def readframes(stream, frame=2**12, channels=None, dtype='<f4', follow=False, poll=0.1):
+    """
+    for x in readframes(stream,frame=2**12,channels=None,dtype='<f4',follow=False,poll=0.1): ...
+    Reads frames of frame samples, (frame,) or (frame, channels) interleaved,
+    from a binary stream: a file opened 'rb', sys.stdin.buffer, or
+    socket.makefile('rb').  Short reads are completed before a frame is
+    yielded.  At the end of the stream the generator stops (dropping a last
+    partial frame), unless follow is True, in which case it waits poll
+    seconds and tries again, like tail -f on a file that is still being
+    recorded.
+    """
+    dtype = np.dtype(dtype)
+    shape = (frame,) if channels is None else (frame, channels)
+    nbytes = int(np.prod(shape))*dtype.itemsize
+    while True:
+        buf = bytearray(nbytes)
+        view = memoryview(buf)
+        got = 0
+        while got < nbytes:
+            n = stream.readinto(view[got:])
+            if n:
+                got += n
+            elif follow:
+                time.sleep(poll)
+            else:
+                return
+        yield np.frombuffer(buf, dtype=dtype).reshape(shape)
+
+
+if __name__ == '__main__':
+    # meter raw float32 samples (Pa) from standard input, e.g.
+    # arecord -t raw -f FLOAT_LE -r 48000 | python -m acoustics.levelmeter 48000
+    import sys
+    fs = float(sys.argv[1]) if len(sys.argv) > 1 else 48000.
+    meter = SoundLevelMeter(fs)
+    for t, L, Lbands in meter.run(readframes(sys.stdin.buffer, meter.frame)):
+        print('%8.2f s  L = %5.1f dB(%s)  Lmax = %5.1f  Leq = %5.1f' %(t, L, meter.type, meter.Lmax, meter.Leq))
@@ -0,0 +1,145 @@
+#Module 'loading.py' contains binfilename, binfileload and loadsession, which read the
+#ID###_###.bin files of a measurement
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+from .instrument import stage
+
+def binfilename(path, IDname, IDnum, CHnum):
+    """
+    filename = binfilename(path, IDname, IDnum, CHnum)
+    Builds the name of the binary file for an ID number and a Channel number,
+    e.g. path/ID001_003.bin
+    """
+
+    # format the IDnum and CHnum strings
+    IDnum = "%03.0f" %IDnum
+    CHnum = "%03.0f" %CHnum
+
+    return os.path.join(path, IDname+IDnum+"_"+CHnum+".bin")
+
+
+def binfileload(path, IDname, IDnum, CHnum, N=-1, NStart=0, mmap=False, dtype=float):
+    """
+    "binfileload" is used to input binary data from a file specified at a certain path with an
+    ID number and an Channel number
+    call x = binfileload(path,IDname,IDnum,CHnum,N=-1,NStart=0,mmap=False,dtype=float)
+    N = number of data points to read.  If N is not specified (-1) it is
+    inferred from the file size, reading everything after NStart.
+    NStart = index of the first data point to read, so a file can be windowed
+    without reading from the beginning.
+    mmap = False returns a copy of the data of type dtype (float64 by
+    default, np.float32 keeps the file's precision at half the memory).
+    mmap = True returns a read-only float32 np.memmap view of the file
+    instead, so no data is read until it is used and nothing is copied.
+    The file opened is reported to observers (see instrument.py) rather than
+    printed.
+    translated to python by Jared Oliphant
+    """
+
+    filename = binfilename(path, IDname, IDnum, CHnum)
+
+    # number of 4-byte floats available after NStart
+    NStart = int(NStart)
+    available = os.path.getsize(filename)//4 - NStart
+    if NStart < 0 or available < 0:
+        raise ValueError('NStart = %d is outside of %s' %(NStart, filename))
+
+    # coerce to an integer, inferring N from the file size if not given
+    N = int(N)
+    if N == -1:
+        N = available
+    if N < 0 or N > available:
+        raise ValueError('cannot read %d points from %s starting at %d' %(N, filename, NStart))
+
+    if mmap:
+        if N == 0:
+            return np.zeros(0, dtype='<f4')
+        # little-endian 4-byte floats, mapped straight from the file
+        with stage('binfileload', file=filename, mmap=True):
+            return np.memmap(filename, dtype='<f4', mode='r', offset=4*NStart, shape=(N,))
+
+    # read N little-endian 4-byte floats starting at NStart
+    with stage('binfileload', file=filename, bytes=4*N, files=1):
+        with open(filename,'rb') as fin:
+            fin.seek(4*NStart)
+            data = np.fromfile(fin, dtype='<f4', count=N)
+
+    # return as a float64 (or dtype) array
+    return data.astype(dtype, copy=False)
+
+
+def _readcolumn(filename, NStart, col):
+    """
+    Reads len(col) little-endian 4-byte floats from filename, starting at
+    NStart, directly into col.  Contiguous float32 columns are filled by the
+    file read itself; anything else goes through a small conversion buffer.
+    """
+    if len(col) == 0:
+        return
+    with open(filename,'rb') as fin:
+        fin.seek(4*NStart)
+        if col.dtype == np.dtype('<f4') and col.flags.c_contiguous:
+            nbytes = fin.readinto(memoryview(col).cast('B'))
+            if nbytes != col.nbytes:
+                raise ValueError('short read from %s' %filename)
+            return
+        buf = np.empty(min(len(col), 2**18), dtype='<f4')
+        for start in range(0, len(col), len(buf)):
+            chunk = buf[:len(col)-start]
+            nbytes = fin.readinto(memoryview(chunk).cast('B'))
+            if nbytes != chunk.nbytes:
+                raise ValueError('short read from %s' %filename)
+            col[start:start+len(chunk)] = chunk
+
+
+def loadsession(path, IDname, IDnums, CHnums, N=-1, NStart=0, out=None, dtype=float, workers=None):
+    """
+    x = loadsession(path,IDname,IDnums,CHnums,N=-1,NStart=0,out=None,dtype=float,workers=None)
+    Loads every (ID, channel) file of a measurement session with a pool of
+    threads, reading each file straight into its own column of one array.
+    Outputs:
+    x = (N, len(IDnums)*len(CHnums)) array.  Column i*len(CHnums)+j holds
+    ID IDnums[i], channel CHnums[j].
+    Inputs:
+    path, IDname = as in binfileload
+    IDnums = sequence of ID numbers, e.g. range(1,82)
+    CHnums = sequence of channel numbers, e.g. range(6)
+    N = number of data points per file.  If N is not specified (-1) it is the
+    shortest file length after NStart.
+    NStart = index of the first data point read from every file
+    out = optional preallocated (N, channels) array to fill.  If not given, a
+    column-major (Fortran ordered) array of type dtype is allocated so each
+    column is contiguous; float32 columns are then filled without any copy.
+    workers = number of reader threads (default from concurrent.futures)
+    The files, bytes read and time taken are reported to observers (see
+    instrument.py).
+    """
+
+    IDnums = list(IDnums)
+    CHnums = list(CHnums)
+    filenames = [binfilename(path, IDname, i, j) for i in IDnums for j in CHnums]
+
+    # number of points to read from every file
+    NStart = int(NStart)
+    N = int(N)
+    if N == -1:
+        N = min(os.path.getsize(filename)//4 for filename in filenames) - NStart
+    for filename in filenames:
+        if NStart < 0 or N < 0 or os.path.getsize(filename)//4 < NStart+N:
+            raise ValueError('cannot read %d points from %s starting at %d' %(N, filename, NStart))
+
+    if out is None:
+        out = np.empty((N, len(filenames)), dtype=dtype, order='F')
+    elif out.shape != (N, len(filenames)):
+        raise ValueError('out has shape %s, expected %s' %(out.shape, (N, len(filenames))))
+
+    # observers get the files, bytes read and time (so the throughput)
+    with stage('loadsession', path=path, files=len(filenames), bytes=4*N*len(filenames)) as st:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            jobs = [pool.submit(_readcolumn, filename, NStart, out[:,k]) for k, filename in enumerate(filenames)]
+            for k, job in enumerate(jobs):
+                job.result()
+                st.progress(k+1, len(jobs))
+
+    return out
@@ -0,0 +1,180 @@
+#Module 'packfile.py' contains pack, writepack and PackFile: a single-file container
+#for the channels of an ID or a whole session, with a header and memory-mappable data
+import numpy as np
+import os
+import json
+import mmap
+import struct
+from .loading import binfileload, _readcolumn
+
+# the file starts with MAGIC, the length of the JSON header as a little-endian
+# uint64 and the header, padded so the data starts on a page boundary
+MAGIC = b'ACPACK01'
+_PAGE = mmap.ALLOCATIONGRANULARITY
+_LAYOUTS = ('planar', 'interleaved')
+
+
+def writepack(filename, x, fs, channels=None, layout='planar', counts=None, attrs=None, chunk=2**20):
+    """
+    writepack(filename,x,fs,channels=None,layout='planar',counts=None,attrs=None,chunk=2**20)
+    Writes the channels x, a list of (N,) arrays (e.g. memmaps from
+    binfileload(...,mmap=True)) or an (N, M) array, to one pack file as
+    little-endian float32, chunk samples at a time so only one chunk is ever
+    in memory.
+    Inputs:
+    fs = sampling frequency
+    channels = label of every channel, anything JSON can hold (lists come
+    back as tuples), e.g. ('ID', 1, 3); 0 to M-1 by default
+    layout = 'planar' stores every channel as one contiguous run (fastest
+    for channel-by-channel work such as autospec and beamform), and
+    'interleaved' stores the samples of all channels together (N, M) (fastest
+    for reading short time ranges of every channel)
+    counts = samples in each original recording, if they differed from N
+    attrs = optional dict of anything else to keep in the header
+    """
+    if layout not in _LAYOUTS:
+        raise ValueError('unknown layout %r, use one of %s' %(layout, _LAYOUTS))
+    if isinstance(x, np.ndarray) and x.ndim == 2:
+        x = [x[:,j] for j in range(x.shape[1])]
+    M = len(x)
+    N = len(x[0])
+    if any(len(xj) != N for xj in x):
+        raise ValueError('the channels have different lengths, trim them to a common N')
+    if channels is None:
+        channels = list(range(M))
+    if len(channels) != M:
+        raise ValueError('%d channel labels for %d channels' %(len(channels), M))
+
+    header = {'format': 'acoustics pack', 'version': 1, 'fs': fs, 'N': N, 'dtype': '<f4', 'layout': layout,
+              'channels': list(channels), 'counts': [N]*M if counts is None else [int(n) for n in counts],
+              'attrs': attrs or {}}
+    text = json.dumps(header).encode()
+    offset = -(-(len(MAGIC) + 8 + len(text))//_PAGE)*_PAGE
+
+    tmp = filename + '.%d.tmp' %os.getpid()
+    with open(tmp, 'wb') as fout:
+        fout.write(MAGIC + struct.pack('<Q', len(text)) + text)
+        fout.write(b'\0'*(offset - fout.tell()))
+        if layout == 'planar':
+            for xj in x:
+                for start in range(0, N, chunk):
+                    fout.write(np.asarray(xj[start:start+chunk], dtype='<f4').tobytes())
+        else:
+            buf = np.empty((min(chunk, N), M), dtype='<f4')
+            for start in range(0, N, chunk):
+                block = buf[:min(chunk, N-start)]
+                for j, xj in enumerate(x):
+                    block[:,j] = xj[start:start+len(block)]
+                fout.write(block.tobytes())
+    # readers never see a partial file
+    os.replace(tmp, filename)
+
+
+def pack(filename, path, IDname, IDnums, CHnums, fs, N=-1, NStart=0, layout='planar', attrs=None):
+    """
+    pack(filename,path,IDname,IDnums,CHnums,fs,N=-1,NStart=0,layout='planar',attrs=None)
+    Packs the ID###_###.bin files of IDnums and CHnums (one ID's channels or
+    a whole session) into one file, see writepack.  The channels are labelled
+    (IDname, ID, CH) in the order of loadsession.  N = -1 keeps the shortest
+    file's length after NStart; the length of every file is kept in the
+    header as counts.
+    """
+    x = [binfileload(path, IDname, i, j, mmap=True) for i in IDnums for j in CHnums]
+    counts = [len(xj) for xj in x]
+    if N == -1:
+        N = min(counts) - NStart
+    if NStart < 0 or N < 0 or NStart+N > min(counts):
+        raise ValueError('cannot pack %d points starting at %d from files of %d' %(N, NStart, min(counts)))
+    x = [xj[NStart:NStart+N] for xj in x]
+    channels = [[IDname, int(i), int(j)] for i in IDnums for j in CHnums]
+    writepack(filename, x, fs, channels, layout, counts, attrs)
+
+
+class PackFile:
+    """
+    pk = PackFile(filename)
+    Reader of a file written by pack or writepack.  Opening it reads only the
+    header:
+    pk.fs, pk.N, pk.layout = sampling frequency, samples per channel, layout
+    pk.channels = label of every channel, e.g. [('ID', 1, 0), ('ID', 1, 1)]
+    pk.counts = samples in each original recording
+    pk.attrs = the extra header entries given to writepack
+    Views mapped from the file, so nothing is read until it is used and
+    nothing is copied (ready for autospec, crossspec, beamform and the
+    SpectralCache, which recognizes whole-file memmaps without hashing them):
+    x = pk.data(), (N, M) read-only float32 memmap of every channel
+    xj = pk.channel(label), (N,) memmap of one channel, by label or number
+    (contiguous for 'planar', strided for 'interleaved')
+    x = pk.channelmaps(), list of every channel's memmap, e.g. for beamform
+    Copies of part of the file, read with seeks so the rest is never touched:
+    x = pk.read(start=0,stop=None,channels=None,dtype=float), (stop-start,
+    len(channels)) samples of the given channel labels or numbers (all of
+    them by default)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as fin:
+            magic = fin.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError('%s is not a pack file' %filename)
+            length, = struct.unpack('<Q', fin.read(8))
+            self.header = json.loads(fin.read(length))
+        self.offset = -(-(len(MAGIC) + 8 + length)//_PAGE)*_PAGE
+        self.fs = self.header['fs']
+        self.N = self.header['N']
+        self.layout = self.header['layout']
+        self.dtype = np.dtype(self.header['dtype'])
+        self.channels = [tuple(label) if isinstance(label, list) else label for label in self.header['channels']]
+        self.counts = self.header['counts']
+        self.attrs = self.header['attrs']
+        self.M = len(self.channels)
+
+    def __len__(self):
+        return self.N
+
+    def __repr__(self):
+        return 'PackFile(%r, fs=%g, N=%d, %d channels, %s)' %(self.filename, self.fs, self.N, self.M, self.layout)
+
+    def index(self, label):
+        """
+        Column of the channel with this label (or number).
+        """
+        if label in self.channels:
+            return self.channels.index(label)
+        if isinstance(label, (int, np.integer)) and 0 <= label < self.M:
+            return int(label)
+        raise KeyError('no channel %r in %s' %(label, self.filename))
+
+    def data(self):
+        order = 'F' if self.layout == 'planar' else 'C'
+        return np.memmap(self.filename, dtype=self.dtype, mode='r', offset=self.offset, shape=(self.N, self.M),
+                         order=order)
+
+    def channel(self, label):
+        j = self.index(label)
+        if self.layout == 'planar':
+            return np.memmap(self.filename, dtype=self.dtype, mode='r', offset=self.offset+j*self.N*4,
+                             shape=(self.N,))
+        return self.data()[:,j]
+
+    def channelmaps(self):
+        return [self.channel(j) for j in range(self.M)]
+
+    def read(self, start=0, stop=None, channels=None, dtype=float):
+        if stop is None:
+            stop = self.N
+        if start < 0 or stop > self.N or stop < start:
+            raise ValueError('cannot read samples %d to %d of %d' %(start, stop, self.N))
+        columns = range(self.M) if channels is None else [self.index(label) for label in channels]
+
+        if self.layout == 'planar':
+            out = np.empty((stop-start, len(columns)), dtype=dtype, order='F')
+            for k, j in enumerate(columns):
+                _readcolumn(self.filename, self.offset//4 + j*self.N + start, out[:,k])
+            return out
+
+        with open(self.filename, 'rb') as fin:
+            fin.seek(self.offset + 4*start*self.M)
+            rows = np.fromfile(fin, dtype=self.dtype, count=(stop-start)*self.M).reshape(-1, self.M)
+        return rows[:,list(columns)].astype(dtype)
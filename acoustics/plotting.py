@@ -0,0 +1,58 @@
+#Module 'plotting.py' contains plotspectrum, plotbands and plotbeam, quick plots of the
+#results.  matplotlib is optional: it is imported by the first plot, never by the
+#rest of the package
+import numpy as np
+
+# reference pressure
+pref = 2e-5
+
+
+def _axes(ax):
+    # the given axes, or new ones
+    if ax is None:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots()
+    return ax
+
+
+def plotspectrum(f, Gxx, ax=None, ref=pref, **kwargs):
+    """
+    ax = plotspectrum(f,Gxx,ax=None,ref=2e-5,**kwargs)
+    Plots the spectral density level 10*log10(Gxx/ref**2) (dB) on a log
+    frequency axis; Gxx may be (len(f),) or (len(f), M).  kwargs go to
+    semilogx.  A new figure is made unless ax is given.
+    """
+    ax = _axes(ax)
+    with np.errstate(divide='ignore'):
+        ax.semilogx(f, 10*np.log10(np.abs(Gxx)/ref**2), **kwargs)
+    ax.set_xlabel("Frequency (Hz)")
+    ax.set_ylabel("Level (dB re 20$\\mu$Pa$^2$/Hz)")
+    return ax
+
+
+def plotbands(fc, spec, ax=None, ref=pref, **kwargs):
+    """
+    ax = plotbands(fc,spec,ax=None,ref=2e-5,**kwargs)
+    Plots band levels 10*log10(spec/ref**2) (dB), e.g. from fractionalOctave,
+    against the band center frequencies; spec may be (len(fc),) or
+    (len(fc), M).
+    """
+    ax = _axes(ax)
+    with np.errstate(divide='ignore'):
+        ax.semilogx(fc, 10*np.log10(np.abs(spec)/ref**2), marker='o', **kwargs)
+    ax.set_xlabel("Band center frequency (Hz)")
+    ax.set_ylabel("SPL (dB re 20$\\mu$Pa)")
+    return ax
+
+
+def plotbeam(lookangles, SPLvec, ax=None, **kwargs):
+    """
+    ax = plotbeam(lookangles,SPLvec,ax=None,**kwargs)
+    Plots the output level of beamform against the look angles (radians),
+    in degrees.
+    """
+    ax = _axes(ax)
+    ax.plot(np.asarray(lookangles)*180/np.pi, SPLvec, **kwargs)
+    ax.set_xlabel("Look angle (degrees)")
+    ax.set_ylabel("SPL (dB)")
+    return ax
@@ -0,0 +1,226 @@
+#Module 'soundpower.py' contains intensitypower and reverbpower, the sound
+#intensity and reverberation room methods of measuring sound power
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .loading import binfileload
+from .spectra import autospec, crossspec, getplan
+from .banding import getfilterbank
+from .instrument import stage
+
+# pressure and power/intensity references
+pref = 2e-5
+iref = 1e-12
+wref = 1e-12
+
+
+def _intensityid(path, IDname, IDnum, CHnums, N, fs, ns, rho, deltax, cache=None):
+    """
+    I,f = _intensityid(path,IDname,IDnum,CHnums,N,fs,ns,rho,deltax,cache=None)
+    Intensity spectrum of one ID of a two-microphone probe, without the zero
+    Hz bin.  Only this one pair of channels is ever in memory, mapped from
+    the files so a cache can recognize them without reading them.
+    """
+    y = binfileload(path,IDname,IDnum,CHnums[0],N,mmap=True)  # farther mic to the source
+    x = binfileload(path,IDname,IDnum,CHnums[1],N,mmap=True)  # closer mic to the source
+
+    Gxy,f = crossspec(x,y,fs,ns,N,cache=cache)
+    f = f[1:]     # cut out zero Hz
+    Gxy = Gxy[1:]
+
+    # equation for intensity
+    return np.imag(Gxy) / 2.0 / np.pi / f / rho / deltax, f
+
+
+def intensitypower(path, IDnums, fs, N=-1, ns=2**15, rho=1.2, deltax=0.0254, Area1=0.15*0.15,
+                   Area2=None, IDname='ID', CHnums=[0,1], flims=[1e2,2e4], width=3, workers=None, cache=None):
+    """
+    I,f,Iavg,Lw,fc = intensitypower(path,IDnums,fs,N=-1,ns=2**15,rho=1.2,deltax=0.0254,
+                                    Area1=0.15*0.15,Area2=None,IDname='ID',CHnums=[0,1],
+                                    flims=[1e2,2e4],width=3,workers=None,cache=None)
+    Sound power of one side of a source by the intensity method.  Every ID is
+    a two-microphone probe measurement over a patch of the surface; the IDs
+    are processed independently, each loading its pair of channels,
+    computing the cross spectrum and intensity and freeing the data, so at
+    most one pair per worker is in memory.
+    Inputs:
+    path, IDname = as in binfileload
+    IDnums = sequence of ID numbers, e.g. range(1,82)
+    fs = sampling frequency
+    N = number of samples per file, all of it if -1
+    ns = samples per block for crossspec
+    rho = density of the air
+    deltax = spacing between the microphones
+    Area1 = area of one measurement, a scalar or one per ID
+    Area2 = total area of the side, the sum of the Area1s if None
+    CHnums = [farther, closer] channel numbers of the probe microphones
+    flims, width = bands of the sound power, as in fractionalOctave
+    workers = number of processes (default from concurrent.futures), or 1
+    to work through the IDs in this process
+    cache = optional SpectralCache for the cross spectra of every ID (its
+    hit and miss counts are only kept for workers=1)
+    Outputs:
+    I = (len(f), len(IDnums)) intensity spectra (W/m**2/Hz) of every ID
+    f = frequency array, without zero Hz
+    Iavg = surface-averaged intensity spectrum of the side
+    Lw = band sound power level (dB re 1 pW) of the side
+    fc = preferred band center frequencies
+    """
+
+    IDnums = list(IDnums)
+    Area1 = np.broadcast_to(np.asarray(Area1, dtype=float), (len(IDnums),))
+    if Area2 is None:
+        Area2 = np.sum(Area1)
+
+    jobs = [(path, IDname, i, CHnums, N, fs, ns, rho, deltax, cache) for i in IDnums]
+    with stage('intensitypower', IDs=len(IDnums)) as st:
+        results = []
+        if workers == 1:
+            for job in jobs:
+                results.append(_intensityid(*job))
+                st.progress(len(results), len(jobs))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                for result in pool.map(_intensityid, *zip(*jobs)):
+                    results.append(result)
+                    st.progress(len(results), len(jobs))
+
+    f = results[0][1]
+    I = np.stack([result[0] for result in results], axis=1)
+
+    # sum up over total area for the surface sound intensity and power
+    W = I @ Area1
+    Iavg = W / Area2
+
+    # band the sound power spectrum
+    bank = getfilterbank(f,flims,width)
+    Lw = 10*np.log10(np.abs(bank.apply(W))/wref)
+
+    return I,f,Iavg,Lw,bank.fc
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def _channelspectra(channels, fs, ns, N, dtype, cache):
+    """
+    Gxx = _channelspectra(channels,fs,ns,N,dtype,cache)
+    autospec of a session given as a list of (N,) channels, cached on the
+    channels themselves (the files behind memmaps), so they are only read
+    into one (N, channels) array when the spectra are not in the cache.
+    """
+    def compute():
+        data = np.empty((len(channels[0]), len(channels)), dtype=channels[0].dtype, order='F')
+        for j, xj in enumerate(channels):
+            data[:,j] = xj
+        return autospec(data,fs,ns,N,dtype=dtype)[0],
+
+    if cache is None:
+        return compute()[0]
+    params = (fs,int(ns),N,np.dtype(dtype).str)
+    return cache.call('reverbpower', channels, params, compute, 1)[0]
+
+
+def reverbpower(x, fs, T60, V, S, temp=20.0, pressure=101325.0, ns=2**15, N=-1, flims=[1e2,1e4],
+                width=3, shape=None, dtype=float, cache=None):
+    """
+    Lw,Lp_bar,sM,spec,fc = reverbpower(x,fs,T60,V,S,temp=20.0,pressure=101325.0,ns=2**15,N=-1,
+                                       flims=[1e2,1e4],width=3,shape=None,dtype=float,cache=None)
+    Sound power of a source in a reverberation room from the band levels of
+    several microphones at each source position (ISO 3741 style).  Every
+    position is banded with the same cached spectral plan and filter bank,
+    and the spatial averages, standard deviations and sound power of all
+    bands and positions are computed at once.
+    Inputs:
+    x = (positions, mics, N) array of one session, or (sessions, positions,
+    mics, N) for many sessions; or a loader function x(s, p) returning the
+    (N, mics) samples of session s, position p, as loadsession does, with
+    shape = (sessions, positions).  The loader may instead return a list of
+    the mics' (N,) channels, e.g. binfileload(...,mmap=True) memmaps; with a
+    cache, each session is then looked up by its files without reading them,
+    and the samples are only read when its spectra are not stored yet
+    fs = sampling frequency
+    T60 = reverberation time (s) of every band, len(fc)
+    V = volume of the room (m**3)
+    S = total surface area of the room (m**2)
+    temp = temperature in Celsius
+    pressure = barometric pressure in Pa
+    ns, N = as in autospec
+    flims, width = bands, as in fractionalOctave
+    dtype = precision of the spectral transforms, as in autospec; np.float32
+    suits float32 data, e.g. from loadsession(...,dtype=np.float32)
+    cache = optional SpectralCache for the spectra of every session (x
+    itself is hashed unless it is a loader of memmapped channels)
+    Outputs (the sessions axis is left out when x is 3-D):
+    Lw = (sessions, positions, len(fc)) sound power level (dB re 1 pW)
+    Lp_bar = spatially averaged band levels (dB re 20 uPa), same shape
+    sM = standard deviation (dB) of the microphone band levels, same shape
+    spec = (sessions, positions, len(fc), mics) band spectra (Pa**2)
+    fc = preferred band center frequencies
+    """
+
+    plan = getplan(int(ns),fs,dtype=dtype)
+    bank = getfilterbank(plan.f,flims,width)
+    fc = bank.fc
+    T60 = np.asarray(T60, dtype=float)
+    if T60.shape != fc.shape:
+        raise ValueError('T60 has %d values, there are %d bands in %s' %(T60.size, len(fc), list(flims)))
+
+    # each session as one (N, positions*mics) array, loaded only when needed
+    squeeze = False
+    if callable(x):
+        if shape is None:
+            raise ValueError('shape = (sessions, positions) is needed with a loader')
+        sessions = ([x(s,p) for p in range(shape[1])] for s in range(shape[0]))
+        positions = shape[1]
+    else:
+        x = np.asarray(x)
+        if x.ndim == 3:
+            x = x[None]
+            squeeze = True
+        sessions = (x[s].reshape(-1,x.shape[-1]).T for s in range(len(x)))
+        positions = x.shape[1]
+
+    # band spectra (sessions, positions, bands, mics), all positions and
+    # microphones of a session at once
+    spec = []
+    for data in sessions:
+        if isinstance(data, list) and all(isinstance(part, (list, tuple)) for part in data):
+            Gxx = _channelspectra([xj for part in data for xj in part], fs, ns, N, dtype, cache)
+        else:
+            if isinstance(data, list):
+                data = np.concatenate(data, axis=1)
+            Gxx = autospec(data,fs,ns,N,dtype=dtype,cache=cache)[0]
+        spec.append(bank.apply(Gxx).reshape(len(fc),positions,-1).transpose(1,0,2))
+    spec = np.array(spec)
+
+    # spatial average, and the standard deviation of the microphone levels
+    # about their arithmetic mean
+    Lp = 10*np.log10(spec/pref**2)
+    Lp_bar = 10*np.log10(np.mean(spec,axis=-1)/pref**2)
+    sM = np.std(Lp,axis=-1,ddof=1)
+
+    # speed of sound at temperature temp
+    c = 20.05*np.sqrt(273+temp)
+
+    # equivalent absorbption area of the room as function of freq (m^2)
+    A = 55.26*V/c/T60
+    A0 = 1.0
+
+    # sound power level of the source as a function of frequency
+    B0 = 1.013e5
+    Lw = Lp_bar + 10*np.log10(A/A0) + 4.34*A/S + 10*np.log10(1+S*c/8/V/fc) \
+         - 25*np.log10(427*np.sqrt(273.0/(273+temp))*pressure/B0/400.0) - 6
+
+    if squeeze:
+        return Lw[0],Lp_bar[0],sM[0],spec[0],fc
+    return Lw,Lp_bar,sM,spec,fc
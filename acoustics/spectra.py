@@ -0,0 +1,691 @@
+#Module 'spectra.py' contains SpectralPlan, autospec, crossspec, crossspecmatrix, spectrogram
+#and WelchAccumulator.  Their blocks, FFTs and buffer sizes are reported to observers,
+#see instrument.py
+import numpy as np 
+import threading
+from functools import lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+from .instrument import stage
+# window functions available to a SpectralPlan
+_WINDOWS = {'hanning': np.hanning, 'hamming': np.hamming, 'blackman': np.blackman,
+            'bartlett': np.bartlett, 'rect': np.ones}
+
+# bytes of workspace a plan keeps between calls, per thread and slot
+_KEEPBYTES = 2**22
+
+class SpectralPlan:
+    """
+    plan = getplan(ns,fs,overlap=0.5,window='hanning',dtype=float)
+    Holds everything autospec, crossspec and crossspecmatrix need for one
+    (ns, fs, overlap, window, dtype): the window and its mean-square value W,
+    the scale factor, the frequency array and workspace for the windowed
+    blocks and their FFTs, sized to the blocks of each call (at most about
+    2**21 samples at a time).  Plans are cached by getplan; workspace of up
+    to _KEEPBYTES is kept per thread so repeated small calls allocate little
+    more than their outputs, and larger workspace is freed after each call.
+    dtype = np.float32 keeps the workspace (blocks and
+    FFTs) in float32/complex64; the sums over blocks are always float64.
+    Gxx,f,OASPL = plan.autospec(x,N=-1,unitflag=0)
+    Gxy,f = plan.crossspec(x,y,N=-1,unitflag=0)
+    Gxy,f,Gxx,coh = plan.crossspecmatrix(x,N=-1,unitflag=0)
+    """
+
+    def __init__(self, ns, fs, overlap=0.5, window='hanning', dtype=float):
+        if window not in _WINDOWS:
+            raise ValueError('unknown window %r, use one of %s' %(window, sorted(_WINDOWS)))
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+            raise ValueError('dtype must be float32 or float64, not %s' %self.dtype)
+        self.cdtype = np.result_type(self.dtype, np.complex64)
+        self.ns = int(ns)
+        self.fs = fs
+        self.overlap = overlap
+        self.window = window
+
+        # samples between the starts of consecutive blocks
+        self.hop = int(round(self.ns*(1-overlap)))
+        if self.hop < 1 or self.hop > self.ns:
+            raise ValueError('overlap = %g is not between 0 and 1' %overlap)
+
+        # frequency array (single sided)
+        self.nf = self.ns//2
+        self.f = (fs/self.ns)*np.arange(0,self.ns/2.)
+        self.f.setflags(write=False)
+        self.df = self.f[1]
+
+        # window function, its mean-square value and spectrum, and the scaling
+        self.ww = _WINDOWS[window](self.ns)
+        self.W = float(np.mean(self.ww**2))
+        self.Wf = np.fft.rfft(self.ww)[:self.nf]
+        self.Scale = 2/float(self.ns)/fs/self.W
+
+        # numpy only picks its single precision FFT when the normalization
+        # factor is float32 (the default factor of 1 runs the double precision
+        # one on a converted copy), so float32 plans transform with
+        # norm='forward' and undo its 1/ns in the window
+        self._norm = None
+        self._ww = self.ww.astype(self.dtype)
+        if self.dtype == np.float32:
+            self._norm = 'forward'
+            self._ww = (self.ww*self.ns).astype(self.dtype)
+
+        self._local = threading.local()
+
+    def numblocks(self, N):
+        """
+        Number of complete blocks in N samples.
+        """
+        return (int(N)-self.ns)//self.hop + 1
+
+    def _workspace(self, slot, shape):
+        # real and complex buffers for a group of blocks shaped like shape.
+        # Small ones are kept per thread and reused by later calls; larger
+        # ones belong to the caller alone and are freed with it, so a cached
+        # plan never holds more than _KEEPBYTES per slot
+        nbytes = int(np.prod(shape))*self.dtype.itemsize*2
+        if nbytes > _KEEPBYTES:
+            return (np.empty(shape, dtype=self.dtype),
+                    np.empty(shape[:-1]+(self.nf+1,), dtype=self.cdtype))
+        work = self._local.__dict__.setdefault('work', {})
+        key = (slot, shape[1:])
+        if key not in work or len(work[key][0]) < shape[0]:
+            work[key] = (np.empty(shape, dtype=self.dtype),
+                         np.empty(shape[:-1]+(self.nf+1,), dtype=self.cdtype))
+        return work[key]
+
+    def _transform(self, blocks, xm=0, slot=0, work=None):
+        # windowed single sided spectra of a group of blocks, as a view of the
+        # workspace work (by default from _workspace, overwritten by the next
+        # call with the same slot), along with the real block buffer which is
+        # free to reuse once this returns
+        n = len(blocks)
+        if work is None:
+            work = self._workspace(slot, blocks.shape)
+        buf, out = work[0][:n], work[1][:n]
+        np.subtract(blocks, np.expand_dims(xm,-1), out=buf)
+        np.multiply(buf, self._ww, out=buf)
+        np.fft.rfft(buf, out=out, norm=self._norm)
+        return out[...,:self.nf], buf
+
+    def _blockffts(self, x, N, xm, slot=0):
+        # yields the spectra of the blocks of the first N samples of x, about
+        # 2**21 samples at a time.  The blocks are a strided view of x, so
+        # only the group being transformed is ever copied.
+        if N > len(x):
+            raise ValueError('N = %d is more than the %d samples given' %(N, len(x)))
+        numBlocks = self.numblocks(N)
+        if numBlocks < 1:
+            raise ValueError('N = %d is too short for one block of ns = %d samples' %(N, self.ns))
+
+        # overlapping blocks as a strided view of x, shape (numBlocks, [M,] ns)
+        blocks = sliding_window_view(x[:N],self.ns,axis=0)[0:(numBlocks-1)*self.hop+1:self.hop]
+
+        # one workspace for every group, no bigger than the blocks need
+        group = max(1, 2**21//x[:1].size//self.ns)
+        work = self._workspace(slot, (min(numBlocks, group),)+blocks.shape[1:])
+        for start in range(0,numBlocks,group):
+            yield self._transform(blocks[start:start+group], xm, slot, work)
+
+    def _squares(self, X, buf):
+        # |X|**2 of every block, computed in (and returned as a view of) buf
+        p = buf[...,:self.nf]
+        q = buf[...,self.nf:2*self.nf]
+        np.multiply(X.real, X.real, out=p)
+        np.multiply(X.imag, X.imag, out=q)
+        np.add(p, q, out=p)
+        return p
+
+    def _power(self, X, buf):
+        # sum of |X|**2 over the blocks, using buf for the squares
+        return np.sum(self._squares(X, buf),axis=0,dtype=float)
+
+    def oaspl(self, Gxx, unitflag=0):
+        """
+        Overall sound pressure level of each channel of Gxx.
+        """
+        if unitflag == 0:
+            return 20*np.log10(np.sqrt(np.sum(Gxx*self.df,axis=0))/2e-5)
+        return 20*np.log10(np.sqrt(np.sum(Gxx,axis=0))/2e-5)
+
+    def autospec(self, x, N=-1, unitflag=0):
+        """
+        Gxx,f,OASPL = plan.autospec(x,N=-1,unitflag=0), see autospec
+        """
+        x = np.asarray(x)
+        if N == -1:
+            N = len(x)
+
+        # sum |X|**2 over the blocks, with the mean of the first N samples of
+        # every channel removed block by block so x is left untouched
+        Gxx = np.zeros(x.shape[1:]+(self.nf,))
+        with stage('autospec', samples=x[:N].size) as st:
+            for X, buf in self._blockffts(x, N, np.mean(x[:N],axis=0,dtype=float)):
+                Gxx += self._power(X, buf)
+                st.add(blocks=len(X), ffts=X[...,0].size, peakbuffer=X.nbytes+buf.nbytes)
+
+        # scale the output, with frequency along the first axis
+        Gxx = self.Scale*Gxx.T/self.numblocks(N)
+
+        # if unitflag = 1 this will become the autospectrum instead of the autospectal density
+        Gxx = Gxx*self.df**unitflag
+
+        return Gxx,self.f,self.oaspl(Gxx,unitflag)
+
+    def crossspec(self, x, y, N=-1, unitflag=0):
+        """
+        Gxy,f = plan.crossspec(x,y,N=-1,unitflag=0), see crossspec
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if N == -1:
+            N = len(x)
+        if len(y) < N:
+            raise ValueError('y has %d samples, fewer than N = %d' %(len(y), N))
+
+        # sum conj(X)*Y over the blocks, in place in the workspace
+        Gxy = np.zeros(x.shape[1:]+(self.nf,), dtype=complex)
+        with stage('crossspec', samples=2*x[:N].size) as st:
+            for (X, bufx), (Y, bufy) in zip(self._blockffts(x, N, np.mean(x[:N],axis=0,dtype=float), 0),
+                                            self._blockffts(y, N, np.mean(y[:N],axis=0,dtype=float), 1)):
+                np.conjugate(X, out=X)
+                np.multiply(X, Y, out=X)
+                Gxy += np.sum(X,axis=0,dtype=complex)
+                st.add(blocks=len(X), ffts=2*X[...,0].size, peakbuffer=2*(X.nbytes+bufx.nbytes))
+
+        Gxy = self.Scale*Gxy.T/self.numblocks(N)
+
+        Gxy = Gxy*self.df**unitflag
+
+        return Gxy,self.f
+
+    def crossspecmatrix(self, x, N=-1, unitflag=0):
+        """
+        Gxy,f,Gxx,coh = plan.crossspecmatrix(x,N=-1,unitflag=0), see crossspecmatrix
+        """
+        x = np.asarray(x)
+        if N == -1:
+            N = len(x)
+
+        # sum conj(X_i)*X_j over the blocks, one (M, M) product per frequency
+        Gxy = np.zeros((self.nf, x.shape[1], x.shape[1]), dtype=complex)
+        with stage('crossspecmatrix', samples=x[:N].size) as st:
+            for X, buf in self._blockffts(x, N, np.mean(x[:N],axis=0,dtype=float)):
+                st.add(blocks=len(X), ffts=X[...,0].size, peakbuffer=X.nbytes+buf.nbytes)
+                X = X.transpose(2,0,1)
+                Gxy += np.matmul(np.conjugate(X).transpose(0,2,1),X)
+
+        Gxy *= self.Scale*self.df**unitflag/self.numblocks(N)
+
+        # the autospectra are the diagonal, and give the coherence of each pair
+        Gxx = np.real(np.diagonal(Gxy,axis1=1,axis2=2)).copy()
+        with np.errstate(divide='ignore',invalid='ignore'):
+            coh = np.abs(Gxy)**2/(Gxx[:,:,None]*Gxx[:,None,:])
+
+        return Gxy,self.f,Gxx,coh
+
+    def spectrogram(self, x, N=-1, unitflag=0, average=1, bank=None, xm=None):
+        """
+        for t,Gxx,Lp in plan.spectrogram(x,N=-1,unitflag=0,average=1,bank=None,xm=None), see spectrogram
+        """
+        x = np.asarray(x)
+        if N == -1:
+            N = len(x)
+        if average < 1:
+            raise ValueError('average = %r must be at least 1' %average)
+        if xm is None:
+            xm = np.mean(x[:N],axis=0,dtype=float)
+
+        def result(first, count, acc):
+            # time of the center of the blocks, and their averaged spectrum
+            t = (first*self.hop + ((count-1)*self.hop + self.ns)/2.)/self.fs
+            Gxx = self.Scale*acc.T/count*self.df**unitflag
+            Lp = self.oaspl(Gxx,unitflag)
+            if bank is not None:
+                Gxx = bank.apply(Gxx)
+            return t,Gxx,Lp
+
+        # |X|**2 of every block, summed over runs of average blocks that may
+        # span the groups of blocks transformed together
+        acc = np.zeros(x.shape[1:]+(self.nf,))
+        first = count = 0
+        with stage('spectrogram', samples=x[:N].size) as st:
+            for X, buf in self._blockffts(x, N, xm):
+                st.add(blocks=len(X), ffts=X[...,0].size, peakbuffer=X.nbytes+buf.nbytes)
+                # X and buf belong to the thread's workspace, which other
+                # spectrogram generators and autospec calls reuse while this
+                # one waits at a yield, so the group's |X|**2 is copied out
+                # before the first yield
+                power = np.array(self._squares(X, buf))
+                start = 0
+                while start < len(power):
+                    n = min(average-count, len(power)-start)
+                    acc += np.sum(power[start:start+n],axis=0,dtype=float)
+                    count += n
+                    start += n
+                    if count == average:
+                        yield result(first, count, acc)
+                        first += count
+                        count = 0
+                        acc[...] = 0
+
+            # a last, shorter run
+            if count:
+                yield result(first, count, acc)
+
+
+@lru_cache(maxsize=16)
+def _plan(ns, fs, overlap, window, dtype):
+    return SpectralPlan(ns, fs, overlap, window, dtype)
+
+
+def getplan(ns, fs, overlap=0.5, window='hanning', dtype=float):
+    """
+    plan = getplan(ns,fs,overlap=0.5,window='hanning',dtype=float)
+    Returns the cached SpectralPlan for (ns, fs, overlap, window, dtype),
+    creating it on first use.  Equal values share a plan however they are
+    given (getplan(1024,1000.) is getplan(1024,1000,0.5,'hanning',np.float64)).
+    """
+    return _plan(int(ns), float(fs), float(overlap), window, np.dtype(dtype))
+
+
+def autospec(x,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',dtype=float,cache=None):
+    """
+    This program calulates the autospectral density or autospectrum and the OASPL of a signal.
+    Hanning windowing is used, with 50% overlap, unless overlap and window say otherwise. Per Bendat and Piersol, Gxx 
+    is scaled by the mean-square value of the window to recover the correct OASPL.
+    call Gxx,f,OASPL = autospec(x,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',dtype=float,cache=None)
+    Outputs: 
+    Gxx = Single-sided autospectrum or autospectral density, depending on unitflag.
+    (ns/2,) for a single channel or (ns/2, M) for M channels.
+    f = frequency array for plotting
+    OASPL = Overall sound pressure level, one per channel
+    Inputs:
+    x = time series data, (N,) or (N, M) with one channel per column.  All
+    channels are processed together and x itself is not modified.
+    fs = sampling frequency
+    ns = number of samples per block.  Default is 2**15 if not specified.
+    N = total number of samples.  If N is not an integer multiple of ns, 
+    the samples less than ns in the last block are discarded.  Default   
+    is all of x, len(x), if not specified.  The mean of these N samples
+    (not of all of x) is removed from every channel.
+    unitflag = 1 for autospectrum, 0 for autospectral density.  Default is
+    autospectral density
+    overlap = fraction of overlap between blocks.  Default is 0.5
+    window = 'hanning', 'hamming', 'blackman', 'bartlett' or 'rect'.  Default is
+    'hanning'.  The window, scaling and workspace buffers are cached in a
+    SpectralPlan shared by every call with the same (ns, fs, overlap, window).
+    dtype = np.float32 windows and transforms the blocks in float32/complex64,
+    halving the memory and bandwidth of float32 data (e.g. from
+    loadsession(...,dtype=np.float32)); the block sums are still accumulated
+    in float64, so Gxx stays float64.  Against the float64 path Gxx differs
+    by less than 1e-5 dB within 60 dB of the spectral peak and 1e-3 dB
+    within 100 dB; further down the float32 round-off floor shows.
+    cache = optional SpectralCache (see spectralcache.py) that returns the
+    stored outputs of an earlier call with the same data and parameters.
+    Authors: Kent Gee, Alan Wall, and Brent Reichman
+    translated to python by Jared Oliphant
+    """
+    # print("In 1 block we travel %.2f meters" %(ns/fs*343))
+    # print("Frequency resolution is %.0f Hz" %(fs/ns))
+
+    plan = getplan(int(ns),fs,overlap,window,dtype)
+    if cache is not None:
+        params = (fs,int(ns),N,unitflag,overlap,window,np.dtype(dtype).str)
+        return cache.call('autospec', (x,), params, lambda: plan.autospec(x,N,unitflag), 3)
+
+    return plan.autospec(x,N,unitflag)
+
+
+
+
+
+
+
+
+
+
+
+
+
+def crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',dtype=float,cache=None):
+    """
+    This program calulates the crossspectral density or spectrum of signals x and y.
+    Hanning windowing is used, with 50% overlap, unless overlap and window say otherwise. Per Bendat and Piersol, Section 11.6.3, Gxy 
+    is scaled by the mean-square value of the window for overall amplitude
+    scaling purposes.
+    call Gxy,f = crossspec(x,y,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',dtype=float,cache=None)
+    Outputs: 
+    Gxy = Single-sided cross spectrum or cross spectral density, depending on unitflag
+    f = frequency array for plotting
+    Inputs:
+    x,y = time series data
+    fs = sampling frequency
+    ns = number of samples per block.  Default is 2^15 if not specified.
+    N = total number of samples.  If N is not an integer multiple of ns, 
+    the samples less than ns in the last block are discarded.  Default   
+    is all of x, len(x), if not specified.  The means of the first N
+    samples of x and y are removed.
+    unitflag = 1 for autospectrum, 0 for autospectral density.  Default is
+    autospectral density
+    overlap = fraction of overlap between blocks.  Default is 0.5
+    window = 'hanning', 'hamming', 'blackman', 'bartlett' or 'rect'.  Default is
+    'hanning'.  The window, scaling and workspace buffers are cached in a
+    SpectralPlan shared by every call with the same (ns, fs, overlap, window).
+    dtype = np.float32 transforms in float32/complex64 and accumulates in
+    complex128, with the accuracy of autospec relative to sqrt(Gxx*Gyy).
+    cache = optional SpectralCache, as in autospec.
+    x and y are not modified.
+    Authors: Kent Gee and Alan Wall; 
+    Translation to python by Jared Oliphant
+    """
+
+    plan = getplan(int(ns),fs,overlap,window,dtype)
+    if cache is not None:
+        params = (fs,int(ns),N,unitflag,overlap,window,np.dtype(dtype).str)
+        return cache.call('crossspec', (x,y), params, lambda: plan.crossspec(x,y,N,unitflag), 2)
+
+    return plan.crossspec(x,y,N,unitflag)
+
+
+
+
+
+
+
+
+
+
+
+
+
+def crossspecmatrix(x,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',dtype=float,cache=None):
+    """
+    This program calculates the full cross-spectral matrix of M channels,
+    transforming each channel only once per block.  Scaling, windowing and
+    overlap are the same as crossspec, so Gxy[:,i,j] equals
+    crossspec(x[:,i],x[:,j],fs,ns,N,unitflag)[0].
+    call Gxy,f,Gxx,coh = crossspecmatrix(x,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',dtype=float,cache=None)
+    Outputs:
+    Gxy = (ns/2, M, M) Hermitian cross-spectral matrix (or density)
+    f = frequency array for plotting
+    Gxx = (ns/2, M) autospectra, the real diagonal of Gxy
+    coh = (ns/2, M, M) coherence |Gxy|**2/(Gxx*Gyy) of every pair
+    Inputs:
+    x = (N, M) time series data with one channel per column
+    fs, ns, N, unitflag, overlap, window, dtype, cache = as in crossspec
+    """
+
+    plan = getplan(int(ns),fs,overlap,window,dtype)
+    if cache is not None:
+        params = (fs,int(ns),N,unitflag,overlap,window,np.dtype(dtype).str)
+        return cache.call('crossspecmatrix', (x,), params, lambda: plan.crossspecmatrix(x,N,unitflag), 4)
+
+    return plan.crossspecmatrix(x,N,unitflag)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def spectrogram(x,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',average=1,flims=None,width=3,
+                xm=None,dtype=float):
+    """
+    Lazily calculates the autospectral density (or autospectrum) of x block by
+    block, for spectrograms, band levels versus time and short-Leq histories
+    of nonstationary signals, in bounded memory.
+    call for t,Gxx,Lp in spectrogram(x,fs,ns=2**15,N=-1,unitflag=0,overlap=0.5,window='hanning',
+                                   average=1,flims=None,width=3,xm=None,dtype=float): ...
+    Outputs, one per run of average blocks:
+    t = time (s) of the center of the blocks
+    Gxx = their autospectral density, scaled as in autospec, (ns/2,) or
+    (ns/2, M); or their band spectra (len(fc),) or (len(fc), M) if flims is
+    given (see fractionalOctave; fc = octavebands(flims,width)[0])
+    Lp = their overall level (the Leq over the blocks), one per channel
+    Inputs:
+    x, fs, ns, N, unitflag, overlap, window, dtype = as in autospec.  x may
+    be a memmap (binfileload(...,mmap=True)); only about 2**21 samples are
+    transformed at a time.
+    average = number of consecutive blocks averaged into each output; the
+    last output may average fewer
+    flims, width = band the spectra with the cached filter bank, as in
+    fractionalOctave
+    xm = mean removed from every channel.  The default is the mean of the
+    first N samples, as in autospec, so the average of every Gxx equals
+    autospec's result; it costs one extra pass over x, so give xm=0 for
+    zero-mean data.
+    Nothing is computed until the generator is iterated, and stopping early
+    skips the rest of x.
+    """
+
+    plan = getplan(int(ns),fs,overlap,window,dtype)
+    bank = None
+    if flims is not None:
+        # banding.py builds on this module, so it is imported when needed
+        from .banding import getfilterbank
+        bank = getfilterbank(plan.f,flims,width)
+
+    return plan.spectrogram(x,N,unitflag,average,bank,xm)
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+class _OverlapBuffer:
+    """
+    Cuts a stream of sample chunks into overlapping blocks of ns samples,
+    hop samples apart, keeping the start of the next incomplete block between
+    chunks.  Chunks are (n,) or (n, M) and may have any length.
+    """
+
+    def __init__(self, ns, hop):
+        self.ns = ns
+        self.hop = hop
+        self.tail = None
+
+    def push(self, chunk, group):
+        """
+        Returns a list of the complete blocks in chunk, at most group at a
+        time, as (blocks, ..., ns) arrays.  Blocks inside chunk are strided
+        views of it, so nothing is copied until they are used.
+        """
+        ns, hop = self.ns, self.hop
+        chunk = np.asarray(chunk)
+        tail = self.tail
+        if tail is None:
+            tail = chunk[:0]
+        lt = len(tail)
+        groups = []
+
+        # blocks that start in the saved tail and finish in this chunk
+        head = np.concatenate((tail, chunk[:ns]))
+        numHead = 0 if len(head) < ns else min(-(-lt//hop), (len(head)-ns)//hop + 1)
+        if numHead:
+            groups.append(sliding_window_view(head, ns, axis=0)[0:(numHead-1)*hop+1:hop])
+
+        # blocks that lie entirely inside this chunk
+        first = numHead*hop - lt
+        numBody = 0 if first < 0 or len(chunk) - first < ns else (len(chunk) - first - ns)//hop + 1
+        if numBody:
+            view = sliding_window_view(chunk[first:], ns, axis=0)[::hop]
+            for start in range(0, numBody, group):
+                groups.append(view[start:start+group])
+
+        # keep everything from the start of the next block
+        nextStart = first + numBody*hop
+        if nextStart >= 0:
+            self.tail = np.array(chunk[nextStart:])
+        else:
+            self.tail = np.concatenate((tail[lt+nextStart:], chunk))
+
+        return groups
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+class WelchAccumulator:
+    """
+    acc = WelchAccumulator(fs,ns=2**15,unitflag=0,overlap=0.5,window='hanning')
+    Streaming version of autospec and crossspec that runs in constant memory.
+    Sample chunks of any size (from a generator, a memmap or a live source)
+    are given to acc.update(x) or acc.update(x,y); the overlap between chunks
+    is kept internally and every complete windowed block (Hanning, 50% overlap
+    by default) is added to running sums of its FFT.  The results are available at any
+    time with
+    Gxx,f,OASPL = acc.autospec()    (Gyy,f,OASPL = acc.autospec(y=True))
+    Gxy,f = acc.crossspec()
+    and have the same scaling as autospec and crossspec.  The zero mean is
+    enforced with the mean of every sample given so far, so after the whole
+    signal has been given the results equal autospec(x,fs,ns,unitflag=unitflag)
+    and crossspec(x,y,fs,ns,unitflag=unitflag).  Chunks may also be (n, M)
+    arrays, which gives (ns/2, M) spectra.  The window, scaling and workspace
+    come from the cached SpectralPlan for (ns, fs, overlap, window).
+    """
+
+    def __init__(self, fs, ns=2**15, unitflag=0, overlap=0.5, window='hanning'):
+        self.plan = getplan(int(ns), fs, overlap, window)
+        self.fs = fs
+        self.ns = self.plan.ns
+        self.unitflag = unitflag
+        self.f = self.plan.f
+        self.df = self.plan.df
+
+        self.numBlocks = 0
+        self.count = 0
+        self.cross = None
+        self._bufx = _OverlapBuffer(self.ns, self.plan.hop)
+        self._bufy = _OverlapBuffer(self.ns, self.plan.hop)
+
+    def update(self, x, y=None):
+        """
+        acc.update(x) or acc.update(x,y)
+        Adds a chunk of samples (and the matching chunk of y) to the estimate.
+        """
+        x = np.asarray(x)
+        if self.cross is None:
+            self.cross = y is not None
+            shape = x.shape[1:] + (self.ns//2,)
+            self.sumx = np.zeros(x.shape[1:])
+            self.SX = np.zeros(shape, dtype=complex)
+            self.SXX = np.zeros(shape)
+            if self.cross:
+                self.sumy = np.zeros(x.shape[1:])
+                self.SY = np.zeros(shape, dtype=complex)
+                self.SYY = np.zeros(shape)
+                self.SXY = np.zeros(shape, dtype=complex)
+        elif self.cross != (y is not None):
+            raise ValueError('update must always be given y or never be given y')
+
+        if self.cross:
+            y = np.asarray(y)
+            if y.shape != x.shape:
+                raise ValueError('x and y chunks must have the same shape')
+
+        # an empty chunk (e.g. from a non-blocking read) adds nothing
+        if len(x) == 0:
+            return
+
+        # process at most about 2**21 samples at a time
+        group = max(1, 2**21//x[:1].size//self.ns)
+
+        with stage('welch', samples=x.size*(1+self.cross)) as st:
+            self.count += len(x)
+            self.sumx += np.sum(x, axis=0)
+            blocksx = self._bufx.push(x, group)
+            if not self.cross:
+                for bx in blocksx:
+                    X, buf = self.plan._transform(bx)
+                    self.numBlocks += len(X)
+                    self.SX += np.sum(X, axis=0)
+                    self.SXX += self.plan._power(X, buf)
+                    st.add(blocks=len(X), ffts=X[...,0].size, peakbuffer=X.nbytes+buf.nbytes)
+                return
+
+            self.sumy += np.sum(y, axis=0)
+            for bx, by in zip(blocksx, self._bufy.push(y, group)):
+                X, bufx = self.plan._transform(bx, 0, 0)
+                Y, bufy = self.plan._transform(by, 0, 1)
+                self.numBlocks += len(X)
+                self.SX += np.sum(X, axis=0)
+                self.SY += np.sum(Y, axis=0)
+                self.SXX += self.plan._power(X, bufx)
+                self.SYY += self.plan._power(Y, bufy)
+                np.conjugate(X, out=X)
+                np.multiply(X, Y, out=X)
+                self.SXY += np.sum(X, axis=0)
+                st.add(blocks=len(X), ffts=2*X[...,0].size, peakbuffer=2*(X.nbytes+bufx.nbytes))
+
+    def _scale(self):
+        if not self.numBlocks:
+            raise ValueError('fewer than ns = %d samples have been given' %self.ns)
+        return self.plan.Scale*self.df**self.unitflag
+
+    def autospec(self, y=False):
+        """
+        Gxx,f,OASPL = acc.autospec(y=False)
+        Autospectrum (or density) of x, or of y if y is True, from the blocks
+        given so far.
+        """
+        if y:
+            if not self.cross:
+                raise ValueError('no y samples have been given')
+            m, SX, SXX = self.sumy/self.count, self.SY, self.SYY
+        else:
+            m, SX, SXX = self.sumx/self.count, self.SX, self.SXX
+
+        m = np.expand_dims(m, -1)
+        K = self.numBlocks
+
+        # remove the mean from the sums: |X - m*Wf|**2 averaged over blocks
+        Wf = self.plan.Wf
+        Gxx = SXX/K - 2*m*np.real(np.conjugate(SX/K)*Wf) + m**2*np.abs(Wf)**2
+        Gxx = self._scale()*Gxx.T
+
+        return Gxx,self.f,self.plan.oaspl(Gxx,self.unitflag)
+
+    def crossspec(self):
+        """
+        Gxy,f = acc.crossspec()
+        Cross spectrum (or density) of x and y from the blocks given so far.
+        """
+        if not self.cross:
+            raise ValueError('no y samples have been given')
+        mx = np.expand_dims(self.sumx/self.count, -1)
+        my = np.expand_dims(self.sumy/self.count, -1)
+        K = self.numBlocks
+
+        # remove the means from the sums: conj(X - mx*Wf)*(Y - my*Wf)
+        Wf = self.plan.Wf
+        Gxy = self.SXY/K - my*Wf*np.conjugate(self.SX/K) \
+         - mx*np.conjugate(Wf)*self.SY/K + mx*my*np.abs(Wf)**2
+        Gxy = self._scale()*Gxy.T
+
+        return Gxy,self.f
@@ -0,0 +1,159 @@
+#Module 'spectralcache.py' contains SpectralCache, an on-disk cache for the
+#results of autospec, crossspec and crossspecmatrix
+import numpy as np
+import os
+import mmap
+import hashlib
+import json
+import zipfile
+
+class SpectralCache:
+    """
+    cache = SpectralCache(directory,maxbytes=2**30)
+    Keeps the outputs of the spectral functions as .npz files in directory,
+    keyed on where the input data came from and every parameter of the call,
+    so rerunning an analysis with the same data returns the stored spectra
+    instead of recomputing them.  Give it to the spectral functions with
+    cache=, e.g.
+    Gxx,f,OASPL = autospec(x,fs,ns,N,cache=cache)
+    Inputs that are memmaps of whole files (binfileload(...,mmap=True)) are
+    identified by their path, offset, size and modification time; any other
+    array by a hash of its contents.  Entries are evicted least recently used
+    first once the files add up to more than maxbytes, and the directory may
+    be shared between processes and runs.
+    cache.hits, cache.misses and cache.evictions count what happened, see
+    cache.stats().
+    """
+
+    def __init__(self, directory, maxbytes=2**30):
+        self.directory = directory
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _identity(self, x):
+        # where the data came from: the file behind a memmap, or its contents
+        if isinstance(x, np.memmap) and isinstance(x.base, mmap.mmap):
+            st = os.stat(x.filename)
+            return ['file', os.path.abspath(x.filename), x.offset, list(x.shape), x.dtype.str,
+                    st.st_size, st.st_mtime_ns]
+
+        x = np.asarray(x)
+        h = hashlib.blake2b(digest_size=20)
+        if x.flags.c_contiguous or x.flags.f_contiguous:
+            h.update(memoryview(np.ravel(x, order='K')).cast('B'))
+        else:
+            # strided views are hashed a few rows at a time
+            step = max(1, 2**20//max(x[:1].size, 1))
+            for start in range(0, len(x), step):
+                h.update(memoryview(np.ascontiguousarray(x[start:start+step])).cast('B'))
+        order = 'F' if x.flags.f_contiguous and not x.flags.c_contiguous else 'C'
+        return ['data', h.hexdigest(), list(x.shape), x.dtype.str, order]
+
+    def key(self, name, arrays, params):
+        """
+        key = cache.key(name,arrays,params)
+        Hex key of the call name(*arrays, *params).
+        """
+        description = [name, [self._identity(x) for x in arrays], [repr(p) for p in params]]
+        return hashlib.blake2b(json.dumps(description).encode(), digest_size=20).hexdigest()
+
+    def _file(self, key):
+        # every entry is one .npz file holding all of its outputs
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key, count=None):
+        """
+        outputs = cache.get(key,count=None), the stored tuple of arrays, or
+        None if there is no entry (or it does not hold count outputs)
+        """
+        filename = self._file(key)
+        try:
+            with np.load(filename) as entry:
+                outputs = tuple(entry['arr_%d' %k][()] for k in range(len(entry.files)))
+            # mark the entry as recently used
+            os.utime(filename)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None
+        if count is not None and len(outputs) != count:
+            return None
+        return outputs
+
+    def put(self, key, outputs):
+        """
+        cache.put(key,outputs) stores a tuple of arrays, then evicts down to maxbytes
+        """
+        # write and rename, so an entry is either complete or not there at all
+        filename = self._file(key)
+        tmp = filename + '.%d.tmp' %os.getpid()
+        with open(tmp, 'wb') as fout:
+            np.savez(fout, *[np.asarray(output) for output in outputs])
+        os.replace(tmp, filename)
+        self.evict()
+
+    def evict(self):
+        """
+        cache.evict() deletes the least recently used entries until the cache
+        holds at most maxbytes
+        """
+        entries = {}
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.npz'):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries[entry.path] = (st.st_size, st.st_mtime_ns)
+
+        total = sum(size for size, used in entries.values())
+        for filename in sorted(entries, key=lambda filename: entries[filename][1]):
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            total -= entries[filename][0]
+            self.evictions += 1
+
+    def call(self, name, arrays, params, compute, count=None):
+        """
+        outputs = cache.call(name,arrays,params,compute,count=None)
+        The stored outputs of name(*arrays, *params), or compute() stored for
+        next time.  count = the number of outputs, if known; an entry with
+        any other number is recomputed.
+        """
+        key = self.key(name, arrays, params)
+        outputs = self.get(key, count)
+        if outputs is not None:
+            self.hits += 1
+            return outputs
+
+        self.misses += 1
+        outputs = compute()
+        self.put(key, outputs)
+        return outputs
+
+    def nbytes(self):
+        """
+        Total size of the stored entries, in bytes.
+        """
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.npz'))
+
+    def stats(self):
+        """
+        {'hits', 'misses', 'evictions', 'bytes', 'maxbytes'} of this cache
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'bytes': self.nbytes(), 'maxbytes': self.maxbytes}
+
+    def clear(self):
+        """
+        Deletes every entry (and the .npy files of older versions).
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(('.npz', '.npy')):
+                os.remove(entry.path)
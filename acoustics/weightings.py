@@ -0,0 +1,225 @@
+#Module 'weightings.py' contains the frequency weighting curves, weighting, and the
+#weighting filters for time series, WeightingFilter and weightedLeq
+import numpy as np
+from functools import lru_cache
+
+def weighting(f,type='A'):
+    """
+    W,Gain = weighting(f,type='A')
+    Gain = 10*log10(W)
+    This function returns the weighting curves, W evaluated at the frequencies,
+    f. Valid types are 'A','B','C','D','Ds','E','G','U','ITUR468', and 'M'.  If type is not specified, the
+    default is A-weighting.  To apply the weighting function to a power or
+    autospectrum, the spectrum is multiplied by this function, W.. 
+    The curves are memoized per (type, f), so weighting a batch of spectra
+    on the same frequency grid is a cached multiply; the returned arrays are
+    read-only.  An unknown type raises ValueError.
+    For digital filters that weight time series directly, see WeightingFilter.
+    Sources: Wikipedia (A-weighting) and https://en.wikipedia.org/wiki/ITU-R_468_noise_weighting
+    Author: Kent Gee    
+    translated to python by Jared Oliphant
+    """
+
+    f = np.asarray(f, dtype=float)
+    W, Gain = _cachedweighting(type.upper(), f.tobytes(), f.shape)
+
+    # return weighting and the gain values (dB)
+    if f.ndim == 0:
+        return W[()], Gain[()]
+    return W, Gain
+
+
+@lru_cache(maxsize=64)
+def _cachedweighting(type, fbytes, shape):
+    f = np.frombuffer(fbytes).reshape(shape)
+    W = np.array(_weightingcurve(f, type), dtype=float)
+    with np.errstate(divide='ignore'):
+        Gain = 10*np.log10(W)
+    W.setflags(write=False)
+    Gain.setflags(write=False)
+    return W, Gain
+
+
+def _weightingcurve(f, type):
+    """
+    W = _weightingcurve(f,type), the weighting curve of the upper case type
+    """
+
+    # calculate based on the type of weighting desired
+    if type == 'A':
+        K = 10.0**(2/20.0)
+        W = K*(12200.**2*f**4)/(f**2+20.6**2)/(f**2+12200.**2)/np.sqrt(f**2+107.7**2)/np.sqrt(f**2+737.9**2)
+        W = W**2
+    elif type == 'B':
+        K=10**(.17/20)
+        W=K*(12200**2*f**3)/(f**2+20.6**2)/(f**2+12200.**2)/np.sqrt(f**2+158.5**2)
+        W=W**2
+    elif type == 'C':
+        K=10**(.06/20)
+        W=K*(12200.**2*f**2)/(f**2+20.6**2)/(f**2+12200.**2)
+        W=W**2
+    elif type == 'DS':
+        K=91104.32
+        s=1j*2*np.pi*f
+        W=np.abs(K*s*(s**2+6532.*s+4.0975e7)/(s+1776.3)/(s+7288.5)/(s**2+21514.*s+3.8836e8))
+        W=W**2
+    elif type == 'D':
+        K=2.1024164e8
+        W=K*f**2*((-519.8)**2+(f+876.2)**2)*((-519.8)**2+(f-876.2)**2)/((-282.)**2+f**2)/((-1160.)**2+f**2)/((-1712.)**2+(f+2628.)**2)/((-1712)**2+(f-2628.)**2)
+    elif type == 'E':
+        K=3.8341500e16
+        W=K*f**4*((-735.)**2+(f+918.)**2)*((-735.)**2+(f-918.)**2)/((-53.5)**2+f**2)/((-378.)**2+f**2)/((-865.)**2+f**2)/((-4024.)**2+(f+3966.)**2)/((-4024.)**2+(f-3966.)**2)/((-6500.)**2+f**2)
+    elif type == 'G':
+        K=10**(231.992/20)
+        W=K*f**8/((-.707)**2+(f+.707)**2)/((-.707)**2+(f-.707)**2)/((-19.27)**2+(f+5.16)**2)/((-19.27)**2+(f-5.16)**2)/((-14.11)**2+(f+14.11)**2)/((-14.11)**2+(f-14.11)**2)/((-5.16)**2+(f+19.27)**2)/((-5.16)**2+(f-19.27)**2)
+    elif type == 'U':
+        K=10**(490.183/10)
+        W=K/((-12200)**2+(f)**2)**2/((-7850.)**2+(f+8800.)**2)/((-7850.)**2+(f-8800.)**2)/((-2900.)**2+(f+12150.)**2)/((-2900.)**2+(f-12150.)**2)
+    elif type == 'ITUR468':
+        K=10**(18.2/20)
+        h1=-4.737338981378384e-24*f**6+2.043828333606125e-15*f**4-1.363894795463638e-7*f**2+1
+        h2=1.306612257412824e-19*f**5-2.118150887518656e-11*f**3+5.559488023498642e-4*f
+        W=K*1.246332637532143e-4*f/np.sqrt(h1**2+h2**2)
+        W=W**2
+    elif type == 'M':
+        K=10**(18.2/20)*10**(-5.5905/20)
+        h1=-4.737338981378384e-24*f**6+2.043828333606125e-15*f**4-1.363894795463638e-7*f**2+1
+        h2=1.306612257412824e-19*f**5-2.118150887518656e-11*f**3+5.559488023498642e-4*f
+        W=K*1.246332637532143e-4*f/np.sqrt(h1**2+h2**2)
+        W=W**2
+    else:
+        raise ValueError('Unknown weighting type %r' %type)
+
+    return W
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+def _weightingzpk(type):
+    """
+    z,p = _weightingzpk(type)
+    Zeros and poles (rad/s) of the analog A, C and ITU-R 468 weighting
+    filters whose |H|**2 are the curves in weighting.  The gain is set
+    separately by matching the curve at 1 kHz.
+    """
+    type = type.upper()
+    if type == 'A':
+        z = np.zeros(4)
+        p = -2*np.pi*np.array([20.6,20.6,107.7,737.9,12200.,12200.])
+    elif type == 'C':
+        z = np.zeros(2)
+        p = -2*np.pi*np.array([20.6,20.6,12200.,12200.])
+    elif type == 'ITUR468':
+        # 1.246e-4*f/(h1 + j*h2) with h1, h2 from weighting is s/D(s) with
+        # s = j*f, D(s) = 1 + 5.559e-4 s + 1.364e-7 s**2 + ... in Hz, scaled to rad/s
+        D = np.array([4.737338981378384e-24,1.306612257412824e-19,2.043828333606125e-15,\
+        2.118150887518656e-11,1.363894795463638e-7,5.559488023498642e-4,1.0])
+        z = np.zeros(1)
+        p = 2*np.pi*np.roots(D)
+    else:
+        raise ValueError('No weighting filter for type %r, use A, C or ITUR468' %type)
+    return z, p
+
+
+class WeightingFilter:
+    """
+    wf = WeightingFilter(fs,type='A')
+    Digital IIR A, C or ITU-R 468 weighting filter for raw time series, so
+    weighted levels can be computed chunk by chunk without going through
+    spectra.  The analog filter of _weightingzpk is mapped to the digital
+    domain with the bilinear transform, with every pole below fs/2
+    prewarped so it keeps its corner frequency, as second order sections,
+    and its gain is matched to the weighting curve at 1 kHz.  Up to 10 kHz
+    the response follows weighting(f,type) within 0.7 dB (A, C) and 1.1 dB
+    (ITU-R 468) at fs = 48 or 50 kHz, and within 0.15 dB and 0.2 dB at
+    fs = 102.4 kHz; above 10 kHz it falls off faster than the curve as it
+    approaches fs/2.
+    y = wf.filter(x)
+    filters the next chunk x, (n,) or (n, M), carrying the filter state over
+    from the previous chunk; the first chunk starts from the steady state of
+    its first sample.  wf.reset() starts over.  Requires scipy.signal.
+    """
+
+    def __init__(self, fs, type='A'):
+        from scipy import signal
+
+        self.fs = fs
+        self.type = type.upper()
+        self._signal = signal
+
+        # prewarp the poles below fs/2, then bilinear transform
+        z, p = _weightingzpk(self.type)
+        r = np.abs(p)
+        below = r < np.pi*fs
+        p[below] *= 2*fs*np.tan(r[below]/(2*fs))/r[below]
+        zd, pd, k = signal.bilinear_zpk(z, p, 1.0, fs)
+        sos = signal.zpk2sos(zd, pd, k)
+
+        # match the weighting curve at 1 kHz
+        w, h = signal.sosfreqz(sos, worN=[1000.], fs=fs)
+        sos[0,:3] *= np.sqrt(weighting(1000.,self.type)[0])/np.abs(h[0])
+        self.sos = sos
+        self.reset()
+
+    def reset(self):
+        """
+        wf.reset(), forget the filter state
+        """
+        self.zi = None
+
+    def filter(self, x):
+        """
+        y = wf.filter(x), weighted chunk of samples
+        """
+        x = np.asarray(x, dtype=float)
+        if self.zi is None:
+            zi = self._signal.sosfilt_zi(self.sos)
+            self.zi = zi.reshape(zi.shape+(1,)*(x.ndim-1))*x[:1]
+        y, self.zi = self._signal.sosfilt(self.sos, x, axis=0, zi=self.zi)
+        return y
+
+
+def weightedLeq(x, fs, type='A', chunk=2**20):
+    """
+    Leq = weightedLeq(x,fs,type='A',chunk=2**20)
+    Weighted equivalent continuous sound level (dB re 20 uPa) of a time
+    series, computed in the time domain with WeightingFilter.
+    x = (N,) or (N, M) array (which may be a memmap) processed chunk samples
+    at a time, or an iterable of such chunks, e.g. from a live source.
+    Gives one level per channel.
+    """
+    wf = WeightingFilter(fs, type)
+    chunks = x
+    if isinstance(x, np.ndarray):
+        chunks = (x[i:i+chunk] for i in range(0, len(x), chunk))
+
+    # running sum of the squared weighted pressure
+    total = 0.
+    count = 0
+    for xi in chunks:
+        y = wf.filter(xi)
+        total = total + np.sum(y**2, axis=0)
+        count += len(y)
+
+    pref = 2e-5
+    return 10*np.log10(total/count/pref**2)
@@ -0,0 +1,239 @@
+"""
+Benchmarks of the loading, spectral, banding, weighting and beamforming
+functions on synthetic datasets shaped like the real measurements:
+the reverberation room session (6 channels x 6.2M samples at 102.4 kHz)
+and one side of the intensity scan (81 IDs x 2 channels x 10.5 s at 50 kHz).
+
+call python benchmarks/bench.py [--scale 0.1] [--out results.json]
+     python benchmarks/bench.py --compare old.json new.json
+
+--scale shrinks the record lengths (and the number of intensity IDs) so
+the suite can run quickly; use --scale 1 for production sizes.  Every
+benchmark reports its best wall time over --repeat runs and its peak
+traced memory (tracemalloc, which sees numpy's allocations) from one
+extra run.  Results are written as JSON along with the git commit, so
+runs on different commits can be compared with --compare.
+The import_* benchmarks time the cold start of a fresh headless worker
+process: importing the acoustics package and resolving the names a worker
+uses, with its peak resident memory and whether matplotlib was imported.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from acoustics import binfileload, loadsession, weighting, beamform, autospec, crossspec, fractionalOctave
+
+
+def makedataset(path, IDnums, channels, N, fs, seed=0):
+    """
+    Writes ID###_###.bin files of float32 noise with a few tones, unless they
+    already exist with the right size.
+    """
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    t = np.arange(N)/fs
+    for i in IDnums:
+        for j in channels:
+            filename = os.path.join(path, 'ID%03d_%03d.bin' %(i, j))
+            if os.path.exists(filename) and os.path.getsize(filename) == 4*N:
+                continue
+            x = 0.1*rng.standard_normal(N) + np.sin(2*np.pi*1000*t + j) + 0.3*np.sin(2*np.pi*4000*t)
+            x.astype('<f4').tofile(filename)
+
+
+def gitcommit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def measure(func, repeat):
+    """
+    best,peak = measure(func,repeat), best wall time (s) and peak traced bytes
+    """
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(times), peak
+
+
+# cold starts: code run by a new interpreter, timed from before the first import
+COLDSTARTS = [
+    ('import_package', 'import acoustics'),
+    ('import_autospec', 'import acoustics; acoustics.autospec'),
+    ('import_fractionalOctave', 'from acoustics import autospec, fractionalOctave'),
+    ('import_everything', 'import acoustics; [getattr(acoustics, name) for name in acoustics.__all__ '
+                          'if name not in ("plotting", "plotspectrum", "plotbands", "plotbeam")]'),
+    ('import_acousticsFunctions', 'import acousticsFunctions'),
+]
+
+_COLDSTART = """
+import time
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+import json, sys
+try:
+    # peak resident memory of this process only (ru_maxrss can include the parent's)
+    with open('/proc/self/status') as fin:
+        peak = [int(line.split()[1])*1024 for line in fin if line.startswith('VmHWM')][0]
+except OSError:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+print(json.dumps([elapsed, peak, 'matplotlib' in sys.modules]))
+"""
+
+
+def coldstart(code, repeat):
+    """
+    best,peak,matplotlib = coldstart(code,repeat), best time (s) of code in a
+    fresh interpreter, its peak resident memory and whether it imported matplotlib
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _COLDSTART %code], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return min(run[0] for run in runs), max(run[1] for run in runs), any(run[2] for run in runs)
+
+
+def benchmarks(data, scale):
+    """
+    List of (name, function) pairs, with the datasets written to data.
+    """
+    # reverberation room session, 6 channels at 102.4 kHz
+    rfs = 102.4e3
+    rN = int(6195200*scale)
+    rpath = os.path.join(data, 'reverb')
+    makedataset(rpath, [1], range(6), rN, rfs, seed=1)
+
+    # one side of the intensity scan, 2 channels per ID at 50 kHz
+    ifs = 50000.0
+    iN = int(10.5*ifs*scale)
+    iIDs = range(1, max(2, int(round(81*scale)))+1)
+    ipath = os.path.join(data, 'intensity')
+    makedataset(ipath, iIDs, range(2), iN, ifs, seed=2)
+
+    # 2**15 sample blocks, or shorter ones for small scales
+    ns = min(2**15, 2**int(np.log2(min(rN, iN)//4)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        reverb = loadsession(rpath, 'ID', [1], range(6), rN)
+        reverb32 = loadsession(rpath, 'ID', [1], range(6), rN, dtype=np.float32)
+        pair = loadsession(ipath, 'ID', [1], range(2), iN)
+    Gxx, f, OASPL = autospec(reverb, rfs, ns)
+    fw = np.linspace(10, 20e3, 2**15)
+    fresh = itertools.count(1)   # new frequencies every call, so nothing is memoized
+
+    # beamforming is much slower per sample, so it gets a shorter record
+    bN = min(rN, 2**20)
+    channels = [reverb[:bN,j].copy() for j in range(6)]
+    lookangles = np.linspace(0, np.pi, 181)
+
+    return [
+        ('binfileload', lambda: binfileload(rpath, 'ID', 1, 0, rN)),
+        ('binfileload_mmap', lambda: np.sum(binfileload(rpath, 'ID', 1, 0, rN, mmap=True))),
+        ('loadsession_reverb', lambda: loadsession(rpath, 'ID', [1], range(6), rN)),
+        ('loadsession_intensity', lambda: loadsession(ipath, 'ID', iIDs, range(2), iN)),
+        ('autospec_reverb', lambda: autospec(reverb, rfs, ns)),
+        ('autospec_reverb_float32', lambda: autospec(reverb32, rfs, ns, dtype=np.float32)),
+        ('crossspec_intensity', lambda: crossspec(pair[:,1], pair[:,0], ifs, ns)),
+        ('fractionalOctave', lambda: fractionalOctave(f, Gxx)),
+        ('weighting', lambda: [weighting(fw*(1+1e-9*next(fresh)), type) for type in ['A','C','ITUR468']]),
+        ('weighting_cached', lambda: [weighting(fw, type) for type in ['A','C','ITUR468']]),
+        ('beamform_time', lambda: beamform(channels, rfs, 0.05, lookangles)),
+        ('beamform_frequency', lambda: beamform(channels, rfs, 0.05, lookangles, method='frequency')),
+    ]
+
+
+def run(args):
+    data = args.data or os.path.join(tempfile.gettempdir(), 'acoustics-bench')
+    commit, dirty = gitcommit()
+    results = {}
+    for name, code in COLDSTARTS:
+        if args.only and not any(only in name for only in args.only):
+            continue
+        best, peak, matplotlib = coldstart(code, args.repeat)
+        results[name] = {'time': best, 'peak_bytes': peak, 'matplotlib': matplotlib}
+        print('%-28s %10.4f s %10.1f MB%s' %(name, best, peak/1e6, '  (imported matplotlib)'*matplotlib))
+
+    for name, func in benchmarks(data, args.scale):
+        if args.only and not any(only in name for only in args.only):
+            continue
+        best, peak = measure(func, args.repeat)
+        results[name] = {'time': best, 'peak_bytes': peak}
+        print('%-28s %10.4f s %10.1f MB' %(name, best, peak/1e6))
+
+    output = {'commit': commit, 'dirty': dirty, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'scale': args.scale, 'repeat': args.repeat, 'python': platform.python_version(),
+              'numpy': np.__version__, 'machine': platform.machine(), 'cpus': os.cpu_count(),
+              'results': results}
+    if args.out:
+        with open(args.out, 'w') as fout:
+            json.dump(output, fout, indent=1)
+        print('wrote', args.out)
+
+
+def compare(old, new):
+    with open(old) as fin:
+        a = json.load(fin)
+    with open(new) as fin:
+        b = json.load(fin)
+    if a.get('scale') != b.get('scale'):
+        print('warning: scales differ (%s vs %s)' %(a.get('scale'), b.get('scale')))
+    print('%-28s %10s %10s %7s %9s %9s' %('', (a['commit'] or '?')[:10], (b['commit'] or '?')[:10],
+                                          'speedup', 'old MB', 'new MB'))
+    for name in a['results']:
+        if name not in b['results']:
+            continue
+        ra, rb = a['results'][name], b['results'][name]
+        print('%-28s %10.4f %10.4f %6.2fx %9.1f %9.1f' %(name, ra['time'], rb['time'], ra['time']/rb['time'],
+                                                         ra['peak_bytes']/1e6, rb['peak_bytes']/1e6))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=float, default=0.1, help='fraction of the production record lengths')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark, the best is kept')
+    parser.add_argument('--data', help='directory for the synthetic datasets (default in the temp directory)')
+    parser.add_argument('--only', nargs='*', help='run only benchmarks whose names contain these')
+    parser.add_argument('--out', help='JSON file for the results')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two JSON result files')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
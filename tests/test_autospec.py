@@ -0,0 +1,25 @@
+# the block spectra of the first N samples
+import numpy as np
+import pytest
+
+from acoustics import autospec, crossspec, crossspecmatrix, getplan
+
+fs = 1000.
+ns = 2**10
+
+
+def test_N_beyond_the_samples():
+    x = np.random.default_rng(0).standard_normal((10000, 2))
+    with pytest.raises(ValueError):
+        autospec(x, fs, ns, N=2*len(x))
+    with pytest.raises(ValueError):
+        crossspecmatrix(x, fs, ns, N=len(x)+1)
+    with pytest.raises(ValueError):
+        crossspec(x[:,0], x[:5000,1], fs, ns)
+
+
+def test_getplan_shares_equal_plans():
+    plan = getplan(ns, fs)
+    assert getplan(ns, fs, 0.5, 'hanning', float) is plan
+    assert getplan(float(ns), int(fs), dtype=np.float64) is plan
+    assert getplan(ns, fs, dtype=np.float32) is not plan
@@ -0,0 +1,60 @@
+# beamform against the original one-angle-at-a-time loop, and its two
+# methods against each other where every delay is a whole sample
+import numpy as np
+
+from acoustics import beamform
+
+fs = 8000.
+c = 343.0
+
+
+def _loop(x, fs, d, lookangles, desiredangle):
+    # the original beamform, without its progress bar
+    channels = len(x)
+    indices = int(round((channels-1)*d/c*fs)+18)
+    unshifted = x[0][indices:-indices]
+    SPLvec = []
+    waveform = None
+    for angle in lookangles:
+        theta = angle - 90.0*np.pi/180.0
+        shift = []
+        for j in range(channels-1):
+            shiftindices = int(round((j+1)*d*np.sin(theta)/c*fs))
+            shift.append(x[j+1][indices-shiftindices:-indices-shiftindices])
+        m = unshifted/float(channels)
+        for i in range(len(shift)):
+            m += shift[i]/float(channels)
+        if angle == desiredangle*np.pi/180:
+            waveform = m
+        SPLvec.append(20*np.log10(np.mean(m**2)/2e-5**2))
+    return np.array(SPLvec), waveform
+
+
+def _channels(M=5, N=20000):
+    return list(np.random.default_rng(0).standard_normal((M, N)))
+
+
+def test_matches_original_loop():
+    x = _channels()
+    lookangles = np.linspace(0, np.pi, 181)
+    SPL0, wave0 = _loop(x, fs, 0.1, lookangles, 60)
+    SPL, wave = beamform(x, fs, 0.1, lookangles, 60)
+    np.testing.assert_array_equal(SPL, SPL0)
+    np.testing.assert_array_equal(wave, wave0)
+
+    # chunks of a few delay patterns give the same sums
+    SPL, wave = beamform(x, fs, 0.1, lookangles, 60, maxbytes=3*8*len(wave0))
+    np.testing.assert_array_equal(SPL, SPL0)
+    np.testing.assert_array_equal(wave, wave0)
+
+
+def test_frequency_method_with_whole_sample_delays():
+    # 2 samples of travel between neighbours at endfire, so sin(theta) in
+    # steps of 1/2 gives whole-sample delays
+    x = _channels()
+    d = 2*c/fs
+    lookangles = np.arcsin([-1, -0.5, 0, 0.5, 1]) + np.pi/2
+    SPLt, wavet = beamform(x, fs, d, lookangles, [0, 120], method='time')
+    SPLf, wavef = beamform(x, fs, d, lookangles, [0, 120], method='frequency', nfft=2**10)
+    np.testing.assert_allclose(SPLf, SPLt, atol=1e-9)
+    np.testing.assert_allclose(wavef, wavet, atol=1e-12)
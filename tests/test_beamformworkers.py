@@ -0,0 +1,46 @@
+# beamform spread over worker processes gives exactly the serial results,
+# in chunks small enough to keep every worker busy
+import numpy as np
+
+from acoustics import beamform, instrument
+
+fs = 8000.
+
+
+def _chunks(*args, **kwargs):
+    # number of chunks beamform reports, and its results
+    seen = []
+
+    def observer(event, name, info):
+        if event == 'start' and name == 'beamform':
+            seen.append(info['chunks'])
+
+    instrument.addobserver(observer)
+    try:
+        result = beamform(*args, **kwargs)
+    finally:
+        instrument.removeobserver(observer)
+    return seen[0], result
+
+
+def test_workers_match_serial():
+    x = np.random.default_rng(0).standard_normal((4, 20000))
+    lookangles = np.linspace(0, np.pi, 37)
+    for method in ['time', 'frequency']:
+        SPL0, wave0 = beamform(x, fs, 0.1, lookangles, [30, 90], method=method, nfft=2**11)
+        chunks, (SPL, wave) = _chunks(x, fs, 0.1, lookangles, [30, 90], method=method, nfft=2**11, workers=2)
+        np.testing.assert_array_equal(SPL, SPL0)
+        np.testing.assert_array_equal(wave, wave0)
+        assert chunks >= 2
+
+
+def test_a_chunk_for_every_worker():
+    # wide spacing, so the time method has more than 32 distinct delays
+    x = np.random.default_rng(1).standard_normal((4, 5000))
+    lookangles = np.linspace(0, np.pi, 181)
+    for method in ['time', 'frequency']:
+        serial = _chunks(x, fs, 1.0, lookangles, method=method)[0]
+        assert serial < 8
+        for workers in [8, 32]:
+            chunks = _chunks(x, fs, 1.0, lookangles, method=method, workers=workers)[0]
+            assert workers <= chunks < 2*workers
@@ -0,0 +1,48 @@
+# spectrogram is a generator over the plan's per-thread workspace, so other
+# generators and calls running between its yields must not change its blocks
+import numpy as np
+
+from acoustics import autospec, spectrogram
+
+fs = 51200.
+ns = 2**10
+
+
+def _signals():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((40000, 2)), 3*rng.standard_normal((40000, 2))+1
+
+
+def _alone(x, **kwargs):
+    return [Gxx for t, Gxx, Lp in spectrogram(x, fs, ns, **kwargs)]
+
+
+def test_interleaved_generators():
+    x1, x2 = _signals()
+    for average in [1, 5]:
+        both = list(zip(spectrogram(x1, fs, ns, average=average), spectrogram(x2, fs, ns, average=average)))
+        for G1, G2, (a, b) in zip(_alone(x1, average=average), _alone(x2, average=average), both):
+            np.testing.assert_allclose(a[1], G1, rtol=1e-12)
+            np.testing.assert_allclose(b[1], G2, rtol=1e-12)
+
+
+def test_autospec_between_yields():
+    x1, x2 = _signals()
+    for G1, (t, Gxx, Lp) in zip(_alone(x1), spectrogram(x1, fs, ns)):
+        autospec(x2, fs, ns)
+        np.testing.assert_allclose(Gxx, G1, rtol=1e-12)
+
+
+def test_average_matches_autospec():
+    x1 = _signals()[0]
+    Gxx = autospec(x1, fs, ns)[0]
+    np.testing.assert_allclose(np.mean(_alone(x1), axis=0), Gxx, rtol=1e-10)
+
+
+def test_first_N_samples():
+    # a mean that drifts along x, so the mean of x[:N] is not that of x
+    x = _signals()[0] + np.linspace(0, 5, 40000)[:,None]
+    N = 15000
+    Gxx = autospec(x, fs, ns, N=N)[0]
+    np.testing.assert_allclose(np.mean(_alone(x, N=N), axis=0), Gxx, rtol=1e-10)
+    np.testing.assert_allclose(Gxx, autospec(x[:N], fs, ns)[0], rtol=1e-12)
@@ -0,0 +1,49 @@
+# WelchAccumulator fed the signal in chunks of any size must give the
+# autospec and crossspec of the whole signal
+import numpy as np
+
+from acoustics import WelchAccumulator, autospec, crossspec
+
+fs = 51200.
+ns = 2**10
+
+
+def _chunks(n, rng):
+    # random chunk boundaries, with some empty chunks among them
+    cuts = np.sort(rng.integers(0, n, 40))
+    cuts = np.concatenate([[0, 0], cuts, [cuts[-1], n]])
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def test_autospec_any_chunking():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((30000, 2))+0.5
+    Gxx, f, OASPL = autospec(x, fs, ns)
+    for trial in range(3):
+        acc = WelchAccumulator(fs, ns)
+        for a, b in _chunks(len(x), rng):
+            acc.update(x[a:b])
+        G, f2, L = acc.autospec()
+        np.testing.assert_allclose(G, Gxx, rtol=1e-10)
+        np.testing.assert_allclose(L, OASPL, rtol=1e-12)
+        np.testing.assert_array_equal(f2, f)
+
+
+def test_crossspec_any_chunking():
+    rng = np.random.default_rng(1)
+    x = rng.standard_normal(30000)
+    y = np.roll(x, 3)+0.1*rng.standard_normal(30000)+1
+    Gxy = crossspec(x, y, fs, ns)[0]
+    acc = WelchAccumulator(fs, ns)
+    for a, b in _chunks(len(x), rng):
+        acc.update(x[a:b], y[a:b])
+    np.testing.assert_allclose(acc.crossspec()[0], Gxy, rtol=1e-9, atol=1e-12*np.abs(Gxy).max())
+    np.testing.assert_allclose(acc.autospec(y=True)[0], autospec(y, fs, ns)[0], rtol=1e-10)
+
+
+def test_empty_first_chunk():
+    x = np.random.default_rng(2).standard_normal(5000)
+    acc = WelchAccumulator(fs, ns)
+    acc.update(x[:0])
+    acc.update(x)
+    np.testing.assert_allclose(acc.autospec()[0], autospec(x, fs, ns)[0], rtol=1e-10)